@@ -1,28 +1,137 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-from core.controllers import GenerationOrchestrator
-from core.repo.user_repository import UserRepository
-from core.repo.projects_repository import ProjectsRepository
+from flask import Flask, Blueprint, Response, current_app, render_template, request, jsonify, session, redirect, url_for, stream_with_context, send_from_directory
+from werkzeug.local import LocalProxy
+from config import Config
+from cli import register_commands
+from http_cache import etag_for, not_modified, conditional, compress_response, accepts_gzip
+from static_assets import AssetManifest
 import random
 import os, re
+import io
+import json
+import mimetypes
+import time
 from datetime import timedelta 
 import random
 
-app = Flask(__name__)
+bp = Blueprint("main", __name__)
 
-if os.environ.get('FLASK_ENV') == 'development' or True:
-    app.secret_key = os.urandom(24).hex()
-    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
-    app.config['SESSION_COOKIE_NAME'] = 'dev_session_' + str(random.randint(1000, 9999))
-else:
-    app.secret_key = 'blablabla'
 
-user_repository = UserRepository()
-projects_repository = ProjectsRepository()
+def component(name):
+    return LocalProxy(lambda: current_app.extensions["codegen"][name])
 
-controller = GenerationOrchestrator(user_repository, projects_repository)
 
+user_repository = component("user_repository")
+projects_repository = component("projects_repository")
+jobs_repository = component("jobs_repository")
+result_store = component("result_store")
+controller = component("controller")
 
-@app.route("/")
+
+def create_app(production: bool = False):
+    started = time.perf_counter()
+
+    from core.controllers import GenerationOrchestrator
+    from core.repo.user_repository import UserRepository
+    from core.repo.projects_repository import ProjectsRepository
+    from core.repo.jobs_repository import JobsRepository
+    from core.results import GenerationResultStore
+    from core.user_cache import UserCache, CachedUserRepository
+    from core.sessions import SessionSweeper
+
+    app = Flask(__name__)
+
+    if production:
+        # ключ общий для всех воркеров, иначе сессия живет только в одном процессе
+        app.secret_key = Config.SECRET_KEY
+        app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
+    else:
+        app.secret_key = os.urandom(24).hex()
+        app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
+        app.config['SESSION_COOKIE_NAME'] = 'dev_session_' + str(random.randint(1000, 9999))
+
+    # LLM-клиенты и фоновые потоки здесь не создаются: DependencyInjector собирает их
+    # лениво в каждом процессе, а воркеры очереди запускает start_background после fork
+    components = {
+        "user_repository": CachedUserRepository(UserRepository(), UserCache()),
+        "projects_repository": ProjectsRepository(),
+        "jobs_repository": JobsRepository(),
+        "result_store": GenerationResultStore()
+    }
+    components["session_sweeper"] = SessionSweeper(components["user_repository"])
+    components["controller"] = GenerationOrchestrator(
+        components["user_repository"],
+        components["projects_repository"],
+        components["jobs_repository"],
+        components["result_store"]
+    )
+    components["assets"] = load_assets(app)
+    app.extensions["codegen"] = components
+    app.register_blueprint(bp)
+    app.after_request(compress_response)
+    register_commands(app)
+
+    print(f"[Startup] Приложение собрано за {(time.perf_counter() - started) * 1000:.0f} мс (pid {os.getpid()})")
+    return app
+
+
+def load_assets(app):
+    assets = AssetManifest(app.static_folder)
+    if not Config.ASSETS_ENABLED:
+        return assets
+    # сборка идет один раз в мастере gunicorn (preload_app), воркеры получают готовый манифест
+    if Config.ASSETS_BUILD_ON_STARTUP:
+        stats = assets.build()
+        print(f"[Assets] Собрано файлов: {stats['files']}, {stats['source_bytes']} -> "
+              f"{stats['minified_bytes']} байт (gzip {stats['gzip_bytes']}) за {stats['seconds']} с")
+    elif not assets.load():
+        print("[Assets] Манифест не найден, статика отдается без отпечатков")
+    return assets
+
+
+def start_background(app):
+    from core.di import DependencyInjector
+
+    started = time.perf_counter()
+    DependencyInjector.ensure_initialized()
+    app.extensions["codegen"]["controller"].start_workers()
+    app.extensions["codegen"]["session_sweeper"].start()
+    print(f"[Startup] Сервисы воркера готовы за {(time.perf_counter() - started) * 1000:.0f} мс (pid {os.getpid()})")
+
+
+def stop_background(app):
+    components = app.extensions["codegen"]
+    components["session_sweeper"].stop()
+    # отложенные входы и сессии не должны потеряться при остановке воркера
+    if components["user_repository"].write_buffer:
+        components["user_repository"].write_buffer.stop()
+
+
+@bp.app_template_global()
+def asset_url(filename):
+    built = current_app.extensions["codegen"]["assets"].resolve(filename)
+    if built:
+        return url_for('.asset', filename=built)
+    return url_for('static', filename=filename)
+
+@bp.route(f"/static/{Config.ASSETS_DIR}/<path:filename>")
+def asset(filename):
+    # имя файла содержит хэш содержимого, поэтому браузер не перепроверяет его до истечения max-age
+    assets = current_app.extensions["codegen"]["assets"]
+    compressed = accepts_gzip() and os.path.isfile(os.path.join(assets.output_path, filename + ".gz"))
+    response = send_from_directory(
+        assets.output_path,
+        filename + ".gz" if compressed else filename,
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        max_age=Config.ASSETS_MAX_AGE
+    )
+    if compressed:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@bp.route("/")
 def index():
     user_data = controller.validate_session_user(session)
     if user_data:
@@ -37,38 +146,38 @@ def index():
                               role=role,
                               email=email)
     
-    return redirect(url_for('login_page'))
+    return redirect(url_for('.login_page'))
 
-@app.route("/force_logout")
+@bp.route("/force_logout")
 def force_logout():
     if 'session_id' in session:
         user_repository.delete_session(session['session_id'])
     
     session.clear()
     print("Сессия принудительно очищена через /force_logout")
-    return redirect(url_for('login_page'))
+    return redirect(url_for('.login_page'))
 
-@app.route("/login")
+@bp.route("/login")
 def login_page():
     if controller.validate_session_user(session):
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
     return render_template("authorisation.html")
 
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     if 'session_id' in session:
         user_repository.delete_session(session['session_id'])
     
     session.clear()
-    return redirect(url_for('login_page'))
+    return redirect(url_for('.login_page'))
 
-@app.route("/api/login", methods=["POST"])
+@bp.route("/api/login", methods=["POST"])
 def api_login():
     data = request.get_json()
     result = controller.handle_login(data, request, session)
     return jsonify(result)
 
-@app.route("/api/check_auth")
+@bp.route("/api/check_auth")
 def check_auth():
     if 'session_id' in session:
         session_data = user_repository.validate_session(session['session_id'])
@@ -81,120 +190,53 @@ def check_auth():
     return jsonify({"authenticated": False})
 
 
-@app.route("/register")
+@bp.route("/register")
 def register_page():
     if controller.validate_session_user(session):
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
     return render_template("authorisation.html") 
 
-@app.route("/api/register", methods=["POST"])
+@bp.route("/api/register", methods=["POST"])
 def api_register():
-    data = request.get_json()
-    
-    required_fields = ['username', 'email', 'password', 'confirm_password', 'role']
-    for field in required_fields:
-        if field not in data or not str(data[field]).strip():
-            return jsonify({
-                "success": False,
-                "message": f"Поле '{field}' обязательно для заполнения"
-            }), 400
+    data = request.get_json() or {}
     
-    if data['password'] != data['confirm_password']:
+    error = controller.validate_registration(data)
+    if error:
         return jsonify({
             "success": False,
-            "message": "Пароли не совпадают"
+            "message": error
         }), 400
     
+    result = controller.register_user(data)
+    if result["success"]:
+        return jsonify(result)
     
-    username_regex = r'^[a-zA-Z0-9_.-]{3,20}$'
-    if not re.match(username_regex, data['username']):
-        return jsonify({
-            "success": False,
-            "message": "Имя пользователя должно содержать от 3 до 20 символов (латинские буквы, цифры, _ . -)"
-        }), 400
-    
-    email_regex = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
-    if not re.match(email_regex, data['email']):
-        return jsonify({
-            "success": False,
-            "message": "Введите корректный email адрес"
-        }), 400
-    
-    if len(data['password']) < 6:
-        return jsonify({
-            "success": False,
-            "message": "Пароль должен содержать минимум 6 символов"
-        }), 400
-    
-    existing_user = user_repository.get_user_by_username(data['username'])
-    if existing_user:
-        return jsonify({
-            "success": False,
-            "message": "Пользователь с таким именем уже существует"
-        }), 400
-    
-    success = user_repository.create_user(
-        username=data['username'],
-        password=data['password'],
-        email=data['email'],
-        full_name=data.get('full_name'),
-        role=data['role']
+    return jsonify(result), 400 if result.get("exists") else 500
+
+@bp.route("/api/users/provision", methods=["POST"])
+def api_provision_users():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+    # роль берется из базы, а не из cookie: снятие прав действует сразу
+    session_data = user_repository.validate_session(session.get('session_id'))
+    if not session_data or session_data['role'] != 'ADMIN':
+        return jsonify({"success": False, "message": "Недостаточно прав"}), 403
+
+    from core.provisioning import provision_users_csv
+    source = io.TextIOWrapper(io.BufferedReader(request.stream, buffer_size=64 * 1024), encoding='utf-8-sig')
+    report = provision_users_csv(
+        controller,
+        source,
+        demo_projects=request.args.get('demo_projects') == '1'
     )
-    
-    if success:
-        user = user_repository.get_user_by_username(data['username'])
-        if user:
-            demo_projects = [
-                {
-                    'name': 'Первое приложение',
-                    'description': 'Добро пожаловать в CodeGen AI! Это ваш первый проект.',
-                    'language': 'Python',
-                    'framework': 'None',
-                    'status': 'completed'
-                },
-                {
-                    'name': 'Демо API',
-                    'description': 'Пример REST API для обучения',
-                    'language': 'TypeScript',
-                    'framework': 'Express.js',
-                    'status': 'draft'
-                }
-            ]
-            
-            for project_data in demo_projects:
-                project_id = projects_repository.create_project(
-                    user_id=user['id'],
-                    name=project_data['name'],
-                    description=project_data['description'],
-                    language=project_data['language'],
-                    framework=project_data['framework'],
-                    status=project_data['status']
-                )
-                
-                lines_of_code = random.randint(100, 500)
-                files_count = random.randint(2, 10)
-                
-                projects_repository.update_project(
-                    project_id=project_id,
-                    user_id=user['id'],
-                    lines_of_code=lines_of_code,
-                    files_count=files_count
-                )
-        
-        return jsonify({
-            "success": True,
-            "message": "Регистрация успешна! Теперь вы можете войти в систему."
-        })
-    else:
-        return jsonify({
-            "success": False,
-            "message": "Ошибка при создании пользователя"
-        }), 500
 
-@app.route("/api/get_stats")
+    print(f"Создание пользователей: {report['created']} строк, {report['rows_per_second']} строк/с")
+    return jsonify({"success": True, **report})
+
+@bp.route("/api/get_stats")
 def api_get_stats():
     try:
-        total_users = len(user_repository.get_all_users())
+        total_users = user_repository.get_total_users_count()
         total_projects = projects_repository.get_total_projects_count()
         
         today_generations = random.randint(300, 400)
@@ -220,7 +262,7 @@ def api_get_stats():
 
 
 
-@app.route("/api/get_hint")
+@bp.route("/api/get_hint")
 def get_hint():
     return jsonify({
         "hint": "Тестовые учетные данные",
@@ -228,14 +270,14 @@ def get_hint():
         "password": "pswd001"
     })
 
-@app.route("/api/feature_not_implemented")
+@bp.route("/api/feature_not_implemented")
 def feature_not_implemented():
     return jsonify({
         "success": False,
         "message": "Данный функционал в данный момент недоступен"
     })
 
-@app.route("/generator")
+@bp.route("/generator")
 def generator():
     user_data = controller.validate_session_user(session)
     if user_data:
@@ -244,7 +286,8 @@ def generator():
         role = user_data.get('role', 'USER')
         email = user_data.get('email', f'{username}@example.com')
         
-        requirement_view_data = controller.get_requirement_view().get_data()
+        requirement_view_data = controller.get_requirement_view(
+            session['user_id'], session.get('session_id')).get_data()
         
         return render_template("generator.html", 
                               full_name=full_name,
@@ -252,9 +295,9 @@ def generator():
                               role=role,
                               email=email,
                               **requirement_view_data)
-    return redirect(url_for('login_page'))
+    return redirect(url_for('.login_page'))
 
-@app.route("/profile")
+@bp.route("/profile")
 def profile():
     user_data = controller.validate_session_user(session)
     if user_data:
@@ -271,9 +314,9 @@ def profile():
                               role=role,
                               email=email,
                               stats=stats)  
-    return redirect(url_for('login_page'))
+    return redirect(url_for('.login_page'))
 
-@app.route("/api/update_profile", methods=["POST"])
+@bp.route("/api/update_profile", methods=["POST"])
 def api_update_profile():
     data = request.get_json()
     result = controller.handle_update_profile(session, data)
@@ -286,7 +329,7 @@ def api_update_profile():
     
     return jsonify(result)
 
-@app.route("/api/update_role", methods=["POST"])
+@bp.route("/api/update_role", methods=["POST"])
 def api_update_role():
     if 'user_id' not in session:
         return jsonify({"success": False, "message": "Требуется авторизация"}), 401
@@ -314,11 +357,11 @@ def api_update_role():
             "message": "Ошибка при изменении роли"
         }), 500
 
-@app.route("/projects")
+@bp.route("/projects")
 def projects():
     user_data = controller.validate_session_user(session)
     if user_data:
-        user_projects = projects_repository.get_user_projects(session['user_id'])
+        page = projects_repository.get_user_projects_page(session['user_id'], limit=Config.PROJECTS_PAGE_SIZE)
         
         stats = projects_repository.get_user_stats(session['user_id'])
         
@@ -332,11 +375,12 @@ def projects():
                               username=username,
                               role=role,
                               email=email,
-                              projects=user_projects,
+                              projects=page['projects'],
+                              next_cursor=page['next_cursor'],
                               stats=stats)
-    return redirect(url_for('login_page'))
+    return redirect(url_for('.login_page'))
 
-@app.route("/templates")
+@bp.route("/templates")
 def templates():
     user_data = controller.validate_session_user(session)
     if user_data:
@@ -350,9 +394,84 @@ def templates():
                               username=username,
                               role=role,
                               email=email)
-    return redirect(url_for('login_page'))
+    return redirect(url_for('.login_page'))
+
+@bp.route("/api/projects")
+def api_list_projects():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    try:
+        limit = int(request.args.get('limit', Config.PROJECTS_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"success": False, "message": "Некорректный размер страницы"}), 400
+
+    try:
+        page = projects_repository.get_user_projects_page(
+            session['user_id'],
+            limit=min(max(limit, 1), Config.PROJECTS_PAGE_MAX),
+            cursor=request.args.get('cursor'),
+            status=request.args.get('status'),
+            language=request.args.get('language'),
+            framework=request.args.get('framework')
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    return jsonify({"success": True, **page})
+
+@bp.route("/api/projects/search")
+def api_search_projects():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"success": False, "message": "Введите поисковый запрос"}), 400
+
+    try:
+        limit = int(request.args.get('limit', Config.PROJECTS_PAGE_SIZE))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({"success": False, "message": "Некорректные параметры страницы"}), 400
+
+    page = projects_repository.search_user_projects(
+        session['user_id'],
+        query,
+        limit=min(max(limit, 1), Config.PROJECTS_PAGE_MAX),
+        offset=max(offset, 0)
+    )
+    return jsonify({"success": True, **page})
+
+@bp.route("/api/projects/export")
+def api_export_projects():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    from core.project_transfer import export_projects_ndjson
+    return Response(
+        stream_with_context(export_projects_ndjson(projects_repository, session['user_id'])),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=projects.ndjson"}
+    )
+
+@bp.route("/api/projects/import", methods=["POST"])
+def api_import_projects():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    from core.project_transfer import import_projects_ndjson
+    # без буфера request.stream отдает строку побайтовыми чтениями
+    source = io.BufferedReader(request.stream, buffer_size=64 * 1024)
+    report = import_projects_ndjson(projects_repository, session['user_id'], source)
+
+    if "fatal_error" in report:
+        return jsonify({"success": False, "message": "Ошибка импорта проектов", **report}), 500
 
-@app.route("/api/projects/create", methods=["POST"])
+    print(f"Импорт проектов: {report['imported']} строк, {report['rows_per_second']} строк/с")
+    return jsonify({"success": True, **report})
+
+@bp.route("/api/projects/create", methods=["POST"])
 def api_create_project():
     if 'user_id' not in session:
         return jsonify({"success": False, "message": "Требуется авторизация"}), 401
@@ -365,7 +484,7 @@ def api_create_project():
     
     return jsonify(result)
 
-@app.route("/api/projects/<int:project_id>", methods=["GET", "PUT", "DELETE"])
+@bp.route("/api/projects/<int:project_id>", methods=["GET", "PUT", "DELETE"])
 def api_project(project_id):
     if 'user_id' not in session:
         return jsonify({"success": False, "message": "Требуется авторизация"}), 401
@@ -377,7 +496,9 @@ def api_project(project_id):
         if not project:
             return jsonify({"success": False, "message": "Проект не найден"}), 404
         
-        return jsonify({"success": True, "project": project})
+        # ключ считается по строке проекта, так что на повторный запрос ответ не сериализуется
+        etag = etag_for("project", *project.values())
+        return not_modified(etag) or conditional(jsonify({"success": True, "project": project}), etag)
     
     elif request.method == 'PUT':
         data = request.get_json()
@@ -407,7 +528,39 @@ def api_project(project_id):
         else:
             return jsonify({"success": False, "message": "Проект не найден или нет прав"}), 404
 
-@app.route("/api/projects/<int:project_id>/open")
+@bp.route("/api/projects/<int:project_id>/artifacts", methods=["GET", "POST"])
+def api_project_artifacts(project_id):
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    user_id = session['user_id']
+    if request.method == 'POST':
+        result = controller.save_project_version(project_id, request.get_json() or {}, user_id)
+        return jsonify(result), (200 if result["success"] else 400)
+
+    if not projects_repository.get_project_by_id(project_id, user_id):
+        return jsonify({"success": False, "message": "Проект не найден"}), 404
+    return conditional(jsonify({"success": True, "versions": projects_repository.artifacts.list_versions(project_id, user_id)}))
+
+@bp.route("/api/projects/<int:project_id>/artifacts/<int:version>/<path:file_name>")
+def api_project_artifact_file(project_id, version, file_name):
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    # версия неизменяема: хэш содержимого и есть ETag, тело читается только при промахе
+    blob_hash = projects_repository.artifacts.get_file_hash(project_id, session['user_id'], version, file_name)
+    if blob_hash is None:
+        return jsonify({"success": False, "message": "Файл не найден"}), 404
+    cached = not_modified(blob_hash[:32])
+    if cached:
+        return cached
+
+    code = projects_repository.artifacts.get_file(project_id, session['user_id'], version, file_name)
+    if code is None:
+        return jsonify({"success": False, "message": "Файл не найден"}), 404
+    return conditional(Response(code, mimetype="text/plain"), blob_hash[:32])
+
+@bp.route("/api/projects/<int:project_id>/open")
 def api_open_project(project_id):
     if 'user_id' not in session:
         return jsonify({"success": False, "message": "Требуется авторизация"}), 401
@@ -416,16 +569,27 @@ def api_open_project(project_id):
     if not project:
         return jsonify({"success": False, "message": "Проект не найден"}), 404
     
- 
-    return jsonify({
+    etag = etag_for("project-open", *project.values())
+    return not_modified(etag) or conditional(jsonify({
         "success": True,
         "message": "Проект открыт",
-        "image_url": url_for('static', filename='picture.jpeg'),
+        "image_url": asset_url('picture.jpeg'),
         "project": project
-    })
+    }), etag)
+
+def event_stream_response(events):
+    def format_events():
+        for event, payload in events:
+            yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    return Response(
+        stream_with_context(format_events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-@app.route("/generate", methods=["POST"])
-def generate():
+@bp.route("/generate", methods=["POST"])
+async def generate():
     print(f"Сессия: {dict(session)}")
     
     if 'user_id' not in session:
@@ -436,28 +600,38 @@ def generate():
         data = request.get_json()
         print(f"Данные запроса: {data}")
         
-        result = controller.handleGenerationRequest(data, dict(session))
-        print(f"Результат контроллера: {result}")
+        if data and data.get('wait'):
+            # результат нужен сразу: ждем асинхронный конвейер, не занимая воркер очереди
+            result = await controller.handleGenerationRequestAsync(data, dict(session))
+            
+            if 'error' in result:
+                print(f"!!!!! ОШИБКА В КОНТРОЛЛЕРЕ: {result['error']}")
+                return jsonify(result), 400
+            
+            return jsonify({
+                'success': True,
+                'code': {'code': result['code'], 'language': result['language']},
+                'status': result['status'],
+                'generated_by': result['generated_by'],
+                'optimization_job_id': result['optimization_job_id'],
+                'result_id': result['result_id'],
+                'message': 'Код успешно сгенерирован'
+            })
+        
+        result = controller.enqueue_generation(data, dict(session))
         
         if 'error' in result:
             print(f"!!!!! ОШИБКА В КОНТРОЛЛЕРЕ: {result['error']}")
             return jsonify(result), 400
         
-        code_view_data = controller.get_code_view().get_data()
-        validation_view_data = controller.get_validation_view().get_data()
-        requirement_view_data = controller.get_requirement_view().get_data()
-        
-        response = {
+        return jsonify({
             'success': True,
-            'code': code_view_data,
-            'validation': validation_view_data,
-            'requirement': requirement_view_data,
-            'message': 'Код успешно сгенерирован'
-        }
-        
-        print(f"Ответ генератора: {response}")
-        
-        return jsonify(response)
+            'job_id': result['job_id'],
+            'status': 'queued',
+            'status_url': url_for('.api_job_status', job_id=result['job_id']),
+            'events_url': url_for('.api_job_events', job_id=result['job_id']),
+            'message': 'Задача генерации поставлена в очередь'
+        }), 202
         
     except Exception as e:
         print(f"!!!!! КРИТИЧЕСКАЯ ОШИБКА В МАРШРУТЕ /generate: {e}")
@@ -470,20 +644,136 @@ def generate():
             "traceback": error_trace[-1000:] 
         }), 500
 
-@app.route("/api/get_validation_results")
+@bp.route("/generate/stream", methods=["POST"])
+def generate_stream():
+    if 'user_id' not in session:
+        return jsonify({"error": "Требуется авторизация"}), 401
+
+    data = request.get_json() or {}
+    if not str(data.get("requirement", "")).strip():
+        return jsonify({"error": "Введите требование!"}), 400
+
+    # конвейер выполняет воркер очереди, а ответ только пересказывает события задачи
+    result = controller.enqueue_generation(data, dict(session), stream=True)
+    if 'error' in result:
+        return jsonify(result), 400
+
+    response = event_stream_response(controller.stream_job(result['job_id'], session['user_id']))
+    response.headers["X-Job-Id"] = result['job_id']
+    return response
+
+@bp.route("/api/cache_stats")
+def api_cache_stats():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    from core.di import DependencyInjector
+    return jsonify({"success": True, "stats": DependencyInjector.get("cache").get_stats()})
+
+@bp.route("/api/singleflight_stats")
+def api_singleflight_stats():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    from core.di import DependencyInjector
+    return jsonify({"success": True, "stats": DependencyInjector.get("singleflight").get_stats()})
+
+@bp.route("/api/jobs/<job_id>")
+def api_job_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    job = controller.get_job(job_id, session['user_id'])
+    if not job:
+        return jsonify({"success": False, "message": "Задача не найдена"}), 404
+
+    return jsonify({"success": True, "job": job})
+
+@bp.route("/api/jobs/<job_id>/events")
+def api_job_events(job_id):
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    if not controller.get_job(job_id, session['user_id']):
+        return jsonify({"success": False, "message": "Задача не найдена"}), 404
+
+    return event_stream_response(controller.watch_job(job_id, session['user_id']))
+
+@bp.route("/api/llm_backends")
+def api_llm_backends():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    from core.di import DependencyInjector
+    return jsonify({
+        "success": True,
+        "backends": DependencyInjector.get("router").get_stats(),
+        "async_runtime": DependencyInjector.get("async_runtime").get_stats(),
+        "hedging": DependencyInjector.get("generation_hedged").get_stats()
+    })
+
+@bp.route("/api/token_budget")
+def api_token_budget():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    from core.di import DependencyInjector
+    return jsonify({"success": True, "stages": DependencyInjector.get("budget").get_stats()})
+
+@bp.route("/api/get_validation_results")
 def api_get_validation_results():
-    validation_view = controller.get_validation_view()
-    return validation_view.render_json()
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    validation_view = controller.get_validation_view(
+        session['user_id'], session.get('session_id'), request.args.get('result_id'))
+    if not validation_view:
+        return jsonify({"success": False, "message": "Результат не найден"}), 404
+    return conditional(validation_view.render_json())
 
-@app.route("/api/get_code_display")
+@bp.route("/api/get_code_display")
 def api_get_code_display():
-    code_view = controller.get_code_view()
-    return code_view.render_json()
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    code_view = controller.get_code_view(
+        session['user_id'], session.get('session_id'), request.args.get('result_id'))
+    if not code_view:
+        return jsonify({"success": False, "message": "Результат не найден"}), 404
+    return conditional(code_view.render_json())
+
+@bp.route("/api/db_stats")
+def api_db_stats():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    from core.repo.database import SQLiteDatabase
+    return jsonify({
+        "success": True,
+        "databases": SQLiteDatabase.get_all_stats(),
+        "user_cache": user_repository.cache.get_stats(),
+        "session_cache": user_repository.session_cache.get_stats(),
+        "session_sweeper": current_app.extensions["codegen"]["session_sweeper"].get_stats(),
+        "sessions_count": user_repository.get_sessions_count(),
+        "artifacts": projects_repository.artifacts.get_stats(),
+        "login_write_buffer": user_repository.write_buffer.get_stats() if user_repository.write_buffer else None
+    })
+
+@bp.route("/api/result_store_stats")
+def api_result_store_stats():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "message": "Требуется авторизация"}), 401
+
+    return jsonify({"success": True, "stats": result_store.get_stats()})
 
 if __name__ == "__main__":
+    app = create_app()
+    start_background(app)
+
     print("⚡ CodeGen AI запущен → http://127.0.0.1:5000")
     print("\nТестовые учетные данные:")
     print("  • Имя пользователя: user001")
     print("  • Пароль: pswd001")
     
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    # перезагрузчик запускает второй процесс с собственной копией сервисов, поэтому он включается только явно
+    app.run(host="0.0.0.0", port=5000, debug=Config.FLASK_DEBUG, use_reloader=Config.FLASK_DEBUG, threaded=True)
@@ -0,0 +1,126 @@
+import csv
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from config import Config
+
+
+def register_commands(app):
+    app.cli.add_command(rebuild_search_command)
+    app.cli.add_command(import_projects_command)
+    app.cli.add_command(export_projects_command)
+    app.cli.add_command(provision_users_command)
+    app.cli.add_command(set_role_command)
+    app.cli.add_command(build_assets_command)
+
+
+def resolve_user_id(username: str) -> str:
+    user = current_app.extensions["codegen"]["user_repository"].get_user_by_username(username)
+    if not user:
+        raise click.ClickException(f"Пользователь {username} не найден")
+    return user['id']
+
+
+@click.command("rebuild-search")
+@with_appcontext
+def rebuild_search_command():
+    """Пересобрать полнотекстовый индекс проектов."""
+    projects_repository = current_app.extensions["codegen"]["projects_repository"]
+
+    started = time.perf_counter()
+    count = projects_repository.rebuild_search_index()
+    elapsed = time.perf_counter() - started
+    click.echo(f"Индекс поиска пересобран: {count} проектов за {elapsed:.2f} с")
+
+
+@click.command("import-projects")
+@click.argument("username")
+@click.argument("source", type=click.File("rb"))
+@click.option("--batch-size", default=Config.IMPORT_BATCH_SIZE, show_default=True, help="Строк в одной транзакции")
+@with_appcontext
+def import_projects_command(username, source, batch_size):
+    """Импортировать проекты пользователя из NDJSON-файла."""
+    from core.project_transfer import import_projects_ndjson
+
+    projects_repository = current_app.extensions["codegen"]["projects_repository"]
+    report = import_projects_ndjson(projects_repository, resolve_user_id(username), source, batch_size=batch_size)
+
+    click.echo(f"Импортировано: {report['imported']}, пропущено: {report['skipped']}, "
+               f"{report['seconds']} с, {report['rows_per_second']} строк/с")
+    for error in report['errors']:
+        click.echo(f"  строка {error['line']}: {error['error']}", err=True)
+    if "fatal_error" in report:
+        raise click.ClickException(f"Импорт прерван на строке {report['failed_line']}: {report['fatal_error']}. "
+                                   f"Продолжить можно со строки {report['resume_from_line']}")
+
+
+@click.command("export-projects")
+@click.argument("username")
+@click.argument("target", type=click.File("w", encoding="utf-8"), default="-")
+@with_appcontext
+def export_projects_command(username, target):
+    """Выгрузить проекты пользователя в NDJSON (по умолчанию в stdout)."""
+    from core.project_transfer import export_projects_ndjson
+
+    projects_repository = current_app.extensions["codegen"]["projects_repository"]
+    started = time.perf_counter()
+    count = 0
+    for line in export_projects_ndjson(projects_repository, resolve_user_id(username)):
+        target.write(line)
+        count += 1
+    elapsed = time.perf_counter() - started
+    rate = round(count / elapsed) if elapsed > 0 else count
+    click.echo(f"Выгружено: {count} проектов за {elapsed:.2f} с, {rate} строк/с", err=True)
+
+
+@click.command("provision-users")
+@click.argument("source", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--role", default="STUDENT", show_default=True, help="Роль, если в строке она не указана")
+@click.option("--demo-projects", is_flag=True, help="Создать каждому пользователю демо-проекты")
+@click.option("--credentials-out", type=click.File("w", encoding="utf-8"), default="-",
+              help="CSV для сгенерированных паролей (по умолчанию stdout)")
+@with_appcontext
+def provision_users_command(source, role, demo_projects, credentials_out):
+    """Создать пользователей из CSV (username,email,full_name,role,password)."""
+    from core.provisioning import provision_users_csv
+
+    controller = current_app.extensions["codegen"]["controller"]
+    report = provision_users_csv(controller, source, demo_projects=demo_projects, default_role=role)
+
+    # сводка уходит в stderr: stdout по умолчанию занят CSV с паролями
+    click.echo(f"Создано: {report['created']}, пропущено: {report['skipped']}, "
+               f"{report['seconds']} с, {report['rows_per_second']} строк/с", err=True)
+    for error in report['errors']:
+        click.echo(f"  строка {error['line']} ({error['username']}): {error['error']}", err=True)
+
+    if report['credentials']:
+        writer = csv.DictWriter(credentials_out, fieldnames=["username", "password"])
+        writer.writeheader()
+        writer.writerows(report['credentials'])
+
+
+@click.command("set-role")
+@click.argument("username")
+@click.argument("role", type=click.Choice(["DEVELOPER", "SYSTEM_ANALYST", "STUDENT", "ADMIN"], case_sensitive=False))
+@with_appcontext
+def set_role_command(username, role):
+    """Назначить пользователю роль (ADMIN выдается только здесь)."""
+    user_repository = current_app.extensions["codegen"]["user_repository"]
+    resolve_user_id(username)
+    if not user_repository.update_user_role(username, role.upper()):
+        raise click.ClickException(f"Не удалось изменить роль пользователя {username}")
+    click.echo(f"Пользователь {username} получил роль {role.upper()}")
+
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Собрать статику с отпечатками, минификацией и .gz-вариантами."""
+    from static_assets import AssetManifest
+
+    stats = AssetManifest(current_app.static_folder).build()
+    click.echo(f"Файлов: {stats['files']}, исходно {stats['source_bytes']} байт, "
+               f"после минификации {stats['minified_bytes']}, gzip {stats['gzip_bytes']}, {stats['seconds']} с")
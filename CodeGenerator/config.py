@@ -3,6 +3,92 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def parse_backends(value: str, default_model: str):
+    # OLLAMA_BACKENDS="http://gpu1:11434/v1|qwen2.5-coder:7b,http://gpu2:11434/v1"
+    backends = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        base_url, _, model = item.partition("|")
+        backends.append({"base_url": base_url.strip(), "model": model.strip() or default_model})
+    return backends
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
-    OLLAMA_MODEL = "qwen2.5-coder:7b"
+    FLASK_DEBUG = os.getenv("FLASK_DEBUG", "0") == "1"
+    WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:5000")
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(min(os.cpu_count() or 1, 4))))
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen2.5-coder:7b")
+    OLLAMA_BACKENDS = parse_backends(os.getenv("OLLAMA_BACKENDS", "http://localhost:11434/v1"), OLLAMA_MODEL)
+    LLM_HEALTH_INTERVAL = float(os.getenv("LLM_HEALTH_INTERVAL", "15"))
+    LLM_HEALTH_TIMEOUT = float(os.getenv("LLM_HEALTH_TIMEOUT", "3"))
+    LLM_MAX_CONTINUATIONS = int(os.getenv("LLM_MAX_CONTINUATIONS", "2"))
+    ASYNC_LLM_CONCURRENCY = int(os.getenv("ASYNC_LLM_CONCURRENCY", "64"))
+
+    HEDGED_PARALLEL = int(os.getenv("HEDGED_PARALLEL", "2"))
+    HEDGED_TEMPERATURES = [float(t) for t in os.getenv("HEDGED_TEMPERATURES", "0.1,0.4,0.7").split(",")]
+    HEDGED_DEFAULT_DELAY = float(os.getenv("HEDGED_DEFAULT_DELAY", "30"))
+
+    GENERATION_CACHE_DB = os.getenv("GENERATION_CACHE_DB", "data/cache_data.db")
+    GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "256"))
+    GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", "86400"))
+    TOKEN_STATS_DB = os.getenv("TOKEN_STATS_DB", "data/cache_data.db")
+    TOKEN_BUDGET_MIN_SAMPLES = int(os.getenv("TOKEN_BUDGET_MIN_SAMPLES", "20"))
+
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+    USER_CACHE_SHARED = os.getenv("USER_CACHE_SHARED", "1") == "1"
+    USER_CACHE_SHARED_DB = os.getenv("USER_CACHE_SHARED_DB", "data/cache_data.db")
+    USER_CACHE_SYNC_INTERVAL = float(os.getenv("USER_CACHE_SYNC_INTERVAL", "1.0"))
+
+    SESSION_DURATION_HOURS = int(os.getenv("SESSION_DURATION_HOURS", "8"))
+    SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "2048"))
+    SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "15"))
+    SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+    SESSION_SWEEP_BATCH = int(os.getenv("SESSION_SWEEP_BATCH", "500"))
+
+    LOGIN_WRITE_BEHIND = os.getenv("LOGIN_WRITE_BEHIND", "1") == "1"
+    LOGIN_FLUSH_INTERVAL_MS = int(os.getenv("LOGIN_FLUSH_INTERVAL_MS", "50"))
+    LOGIN_FLUSH_BATCH = int(os.getenv("LOGIN_FLUSH_BATCH", "200"))
+    LOGIN_QUEUE_MAX = int(os.getenv("LOGIN_QUEUE_MAX", "5000"))
+    LOGIN_FLUSH_MAX_RETRIES = int(os.getenv("LOGIN_FLUSH_MAX_RETRIES", "3"))
+
+    PROJECTS_PAGE_SIZE = int(os.getenv("PROJECTS_PAGE_SIZE", "20"))
+    PROJECTS_PAGE_MAX = int(os.getenv("PROJECTS_PAGE_MAX", "100"))
+
+    ASSETS_ENABLED = os.getenv("ASSETS_ENABLED", "0" if FLASK_DEBUG else "1") == "1"
+    ASSETS_BUILD_ON_STARTUP = os.getenv("ASSETS_BUILD_ON_STARTUP", "1") == "1"
+    ASSETS_DIR = os.getenv("ASSETS_DIR", "dist")
+    ASSETS_MAX_AGE = int(os.getenv("ASSETS_MAX_AGE", str(365 * 24 * 3600)))
+
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+    GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+    GZIP_MIMETYPES = {"application/json", "application/x-ndjson", "text/html", "text/plain",
+                      "text/css", "application/javascript", "text/javascript", "image/svg+xml"}
+
+    ARTIFACT_COMPRESSION_LEVEL = int(os.getenv("ARTIFACT_COMPRESSION_LEVEL", "6"))
+
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+    EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "500"))
+
+    PROVISION_BATCH_SIZE = int(os.getenv("PROVISION_BATCH_SIZE", "500"))
+
+    RESULT_STORE_DB = os.getenv("RESULT_STORE_DB", "data/cache_data.db")
+    RESULT_STORE_SIZE = int(os.getenv("RESULT_STORE_SIZE", "1000"))
+    RESULT_STORE_TTL = int(os.getenv("RESULT_STORE_TTL", "3600"))
+
+    PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+    OPTIMIZE_WORKERS = int(os.getenv("OPTIMIZE_WORKERS", "2"))
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+    JOB_WATCH_TIMEOUT = int(os.getenv("JOB_WATCH_TIMEOUT", "300"))
+    JOB_STREAM_POLL_INTERVAL = float(os.getenv("JOB_STREAM_POLL_INTERVAL", "0.1"))
+    JOB_EVENT_FLUSH_MS = int(os.getenv("JOB_EVENT_FLUSH_MS", "100"))
@@ -0,0 +1,199 @@
+import asyncio
+import threading
+
+from config import Config
+from .models import StructuredModel, GeneratedCode
+from .services import RequirementAnalysisService, CodeGenerationService, ValidationService
+from .services import JsonObjectScanner, CodeFenceStripper, continuation_messages, track_usage
+
+
+class AsyncRuntime:
+    # Один цикл событий на процесс: все асинхронные вызовы LLM выполняются в нем,
+    # поэтому пул соединений AsyncOpenAI и семафор общие для всех запросов
+    def __init__(self, max_concurrency: int = Config.ASYNC_LLM_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.loop = asyncio.new_event_loop()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+
+        self._thread = threading.Thread(target=self._run, name="async-llm-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        return self.submit(coro).result()
+
+    async def call(self, coro):
+        return await asyncio.wrap_future(self.submit(coro))
+
+    async def chat(self, router, messages, **kwargs):
+        async with self.semaphore:
+            self.in_flight += 1
+            try:
+                return await router.achat(messages, **kwargs)
+            finally:
+                self.in_flight -= 1
+
+    async def stream(self, router, messages, **kwargs):
+        # слот семафора занят, пока поток не дочитан или не закрыт
+        async with self.semaphore:
+            self.in_flight += 1
+            stream = None
+            try:
+                stream = await router.achat(messages, stream=True, **kwargs)
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                if stream is not None:
+                    await stream.aclose()
+                self.in_flight -= 1
+
+    def get_stats(self) -> dict:
+        return {"in_flight": self.in_flight, "max_concurrency": self.max_concurrency}
+
+
+async def astream_code(runtime: AsyncRuntime, router, messages: list, usage: dict = None,
+                       max_continuations: int = Config.LLM_MAX_CONTINUATIONS, **kwargs) -> str:
+    # асинхронный вариант services.stream_code: обрыв на закрывающем ``` и продолжение обрезанного ответа
+    usage = usage if usage is not None else {}
+    usage.update({"completion_tokens": 0, "finish_reason": None})
+    stripper = CodeFenceStripper()
+    raw = []
+    code = []
+    request_messages = messages
+
+    for attempt in range(max_continuations + 1):
+        finish_reason = None
+        stream = runtime.stream(router, request_messages, **kwargs)
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = choice.delta.content or ""
+                raw.append(delta)
+                track_usage(usage, chunk)
+                code.append(stripper.feed(delta))
+                if stripper.closed:
+                    usage["finish_reason"] = "fence_closed"
+                    break
+                finish_reason = choice.finish_reason or finish_reason
+        finally:
+            await stream.aclose()
+
+        if stripper.closed or finish_reason != "length":
+            break
+
+        print(f"[astream_code] Ответ обрезан по max_tokens, запрос продолжения {attempt + 1}/{max_continuations}")
+        stripper.resume()
+        request_messages = continuation_messages(messages, "".join(raw))
+
+    code.append(stripper.flush())
+    return "".join(code).strip()
+
+
+class IAsyncRequirementAnalysisService:
+    async def analyze(self, requirement): pass
+
+class AsyncRequirementAnalysisService(RequirementAnalysisService, IAsyncRequirementAnalysisService):
+    def __init__(self, router, budget, runtime: AsyncRuntime):
+        super().__init__(router, budget)
+        self.runtime = runtime
+
+    async def analyze(self, requirement) -> StructuredModel:
+        try:
+            scanner = JsonObjectScanner()
+            parts = []
+            budget = self.budget.estimate_analysis(requirement)
+            usage = {"completion_tokens": 0, "finish_reason": None}
+            stream = self.runtime.stream(
+                self.router,
+                messages=self.build_messages(requirement),
+                temperature=self.TEMPERATURE,
+                max_tokens=budget.max_tokens
+            )
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    text = chunk.choices[0].delta.content or ""
+                    parts.append(text)
+                    track_usage(usage, chunk)
+                    if scanner.feed(text):
+                        usage["finish_reason"] = "json_closed"
+                        break
+            finally:
+                await stream.aclose()
+
+            await asyncio.to_thread(self.budget.record, budget, usage)
+            return self.parse_scanned(scanner, "".join(parts), requirement)
+        except Exception as e:
+            print(f"[AsyncRequirementAnalysisService] Ошибка: {e}")
+            return self.fallback(requirement)
+
+
+class IAsyncCodeGenerationService:
+    async def generateCode(self, structured, with_comments) -> GeneratedCode:
+        pass
+
+class AsyncCodeGenerationService(CodeGenerationService, IAsyncCodeGenerationService):
+    def __init__(self, router, budget, runtime: AsyncRuntime):
+        super().__init__(router, budget)
+        self.runtime = runtime
+
+    async def generateCode(self, structured: StructuredModel, with_comments: bool = False,
+                           temperature: float = None) -> GeneratedCode:
+        try:
+            budget = self.budget.estimate_generation(structured, with_comments)
+            usage = {}
+            code = await astream_code(
+                self.runtime,
+                self.router,
+                self.build_messages(structured, with_comments),
+                usage=usage,
+                temperature=self.TEMPERATURE if temperature is None else temperature,
+                max_tokens=budget.max_tokens
+            )
+            await asyncio.to_thread(self.budget.record, budget, usage)
+        except Exception as e:
+            print(f"[AsyncCodeGenerationService] Ошибка: {e}")
+            code = f"{self.ERROR_PREFIX}: {str(e)}"
+
+        return self.build_result(structured, with_comments, code)
+
+
+class IAsyncValidationService:
+    def validate(self, generated_code):
+        pass
+
+    async def optimize(self, generated_code) -> GeneratedCode:
+        pass
+
+class AsyncValidationService(ValidationService, IAsyncValidationService):
+    def __init__(self, router, budget, runtime: AsyncRuntime):
+        super().__init__(router, budget)
+        self.runtime = runtime
+
+    async def optimize(self, generated_code: GeneratedCode) -> GeneratedCode:
+        try:
+            budget = self.budget.estimate_optimize(generated_code)
+            usage = {}
+            optimized = await astream_code(
+                self.runtime,
+                self.router,
+                self.build_optimize_messages(generated_code),
+                usage=usage,
+                temperature=self.OPTIMIZE_TEMPERATURE,
+                max_tokens=budget.max_tokens
+            )
+            await asyncio.to_thread(self.budget.record, budget, usage)
+            self.apply_optimized(generated_code, optimized)
+        except Exception as e:
+            print(f"[AsyncValidationService] Оптимизация не удалась: {e}")
+        return generated_code
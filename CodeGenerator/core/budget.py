@@ -0,0 +1,163 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from config import Config
+from .repo.database import SQLiteDatabase
+
+
+class TokenBudget:
+    def __init__(self, stage: str, language: str, base: int, max_tokens: int):
+        self.stage = stage
+        self.language = language
+        self.base = base
+        self.max_tokens = max_tokens
+
+
+class TokenBudgetEstimator:
+    # прежние фиксированные лимиты: действуют, пока истории мало, и служат нижней границей анализа
+    DEFAULTS = {
+        "analysis": 512,
+        "generation": 4096,
+        "optimize": 4096
+    }
+    LIMITS = {
+        "analysis": (512, 1024),
+        "generation": (256, 4096),
+        "optimize": (256, 4096)
+    }
+    LANGUAGE_WEIGHT = {
+        "Python": 1.0,
+        "JavaScript": 1.1,
+        "TypeScript": 1.2,
+        "Go": 1.2,
+        "C++": 1.3,
+        "Rust": 1.3,
+        "Java": 1.4
+    }
+    CHARS_PER_TOKEN = 3.5
+    HEADROOM = 1.2
+    HISTORY_SIZE = 200
+
+    def __init__(self, db_path: str = Config.TOKEN_STATS_DB,
+                 min_samples: int = Config.TOKEN_BUDGET_MIN_SAMPLES):
+        self.db_path = db_path
+        self.db = SQLiteDatabase.for_path(db_path)
+        self.min_samples = max(min_samples, 1)
+        self._history = {}
+        self._lock = threading.Lock()
+
+        self.init_database()
+        self.load_history()
+
+    def init_database(self):
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS token_usage (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    stage TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    base_estimate INTEGER NOT NULL,
+                    max_tokens INTEGER NOT NULL,
+                    actual_tokens INTEGER NOT NULL,
+                    finish_reason TEXT,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_token_usage_stage ON token_usage(stage, language, id)')
+
+    def load_history(self):
+        rows = self.db.fetchall('''
+            SELECT stage, language, base_estimate, actual_tokens FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY stage, language ORDER BY id DESC) AS rn
+                FROM token_usage
+                WHERE finish_reason IS NOT 'length'
+            ) WHERE rn <= ? ORDER BY id
+        ''', (self.HISTORY_SIZE,))
+
+        for stage, language, base, actual in rows:
+            self._ratios(stage, language).append(actual / max(base, 1))
+
+    def _ratios(self, stage: str, language: str) -> deque:
+        return self._history.setdefault((stage, language), deque(maxlen=self.HISTORY_SIZE))
+
+    def _tokens(self, text: str) -> int:
+        return int(len(text) / self.CHARS_PER_TOKEN)
+
+    def estimate_analysis(self, requirement) -> TokenBudget:
+        # JSON-ответ примерно повторяет требование плюс разметку сущностей
+        base = 96 + self._tokens(requirement.input_text)
+        return self._budget("analysis", "any", base)
+
+    def estimate_generation(self, structured, with_comments: bool) -> TokenBudget:
+        # анализ нередко возвращает entities списком или null - такие считаются пустыми
+        entities = structured.entities if isinstance(structured.entities, dict) else {}
+        fields_count = sum(len(fields) for fields in entities.values() if isinstance(fields, list))
+        base = 200 + self._tokens(structured.functional_description) * 2
+        base += 120 * len(entities) + 40 * fields_count
+        base *= self.LANGUAGE_WEIGHT.get(structured.target_language, 1.2)
+        if with_comments:
+            base *= 1.5
+        return self._budget("generation", structured.target_language, int(base))
+
+    def estimate_optimize(self, generated_code) -> TokenBudget:
+        # оптимизированный код обычно того же размера, что и исходный
+        base = 64 + int(self._tokens(generated_code.code_body) * 1.1)
+        return self._budget("optimize", generated_code.language, base)
+
+    def _budget(self, stage: str, language: str, base: int) -> TokenBudget:
+        low, high = self.LIMITS[stage]
+        with self._lock:
+            ratios = sorted(self._ratios(stage, language))
+        if len(ratios) < self.min_samples:
+            return TokenBudget(stage, language, base, self.DEFAULTS[stage])
+
+        # берем 90-й перцентиль отношения факт/оценка, чтобы почти не обрезать ответы
+        ratio = ratios[int(len(ratios) * 0.9) - 1]
+        max_tokens = int(min(max(base * max(ratio, 0.25) * self.HEADROOM, low), high))
+        return TokenBudget(stage, language, base, max_tokens)
+
+    def record(self, budget: TokenBudget, usage: dict):
+        actual = usage.get("completion_tokens", 0)
+        if not actual:
+            return
+
+        # обрезанный ответ показывает только лимит, а не нужный размер - на нем не учимся
+        if usage.get("finish_reason") != "length":
+            with self._lock:
+                self._ratios(budget.stage, budget.language).append(actual / max(budget.base, 1))
+
+        print(f"[TokenBudget] {budget.stage}/{budget.language}: оценка {budget.base}, "
+              f"лимит {budget.max_tokens}, факт {actual}, finish_reason={usage.get('finish_reason')}")
+
+        try:
+            self.db.execute('''
+                INSERT INTO token_usage (stage, language, base_estimate, max_tokens,
+                                         actual_tokens, finish_reason, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (budget.stage, budget.language, budget.base, budget.max_tokens,
+                  actual, usage.get("finish_reason"), time.time()))
+        except sqlite3.Error as e:
+            print(f"[TokenBudget] Ошибка записи статистики: {e}")
+
+    def get_stats(self) -> list:
+        rows = self.db.fetchall('''
+            SELECT stage, language, COUNT(*), AVG(base_estimate), AVG(max_tokens), AVG(actual_tokens),
+                   SUM(CASE WHEN finish_reason = 'length' THEN 1 ELSE 0 END)
+            FROM token_usage
+            GROUP BY stage, language
+        ''')
+
+        return [
+            {
+                "stage": stage,
+                "language": language,
+                "requests": count,
+                "avg_estimate": round(avg_base or 0),
+                "avg_max_tokens": round(avg_max or 0),
+                "avg_actual": round(avg_actual or 0),
+                "truncated": truncated
+            }
+            for stage, language, count, avg_base, avg_max, avg_actual, truncated in rows
+        ]
@@ -0,0 +1,234 @@
+import sqlite3
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import Config
+from .models import StructuredModel, GeneratedCode
+from .repo.database import SQLiteDatabase
+from .services import IRequirementAnalysysService, ICodeGenerationService
+
+
+class GenerationCache:
+    def __init__(self, db_path: str = Config.GENERATION_CACHE_DB,
+                 max_size: int = Config.GENERATION_CACHE_SIZE,
+                 ttl_seconds: int = Config.GENERATION_CACHE_TTL):
+        self.db_path = db_path
+        self.db = SQLiteDatabase.for_path(db_path)
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "bypassed": 0}
+
+        self.init_database()
+
+    def init_database(self):
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS generation_cache (
+                cache_key TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        # регистр не приводится: от него зависят идентификаторы в сгенерированном коде
+        return " ".join(text.split())
+
+    @classmethod
+    def make_key(cls, stage: str, text: str, language: Optional[str] = None,
+                 with_comments: bool = False, model: str = Config.OLLAMA_MODEL, temperature: float = 0.0) -> str:
+        raw = json.dumps([stage, cls.normalize(text), language, bool(with_comments), model, temperature],
+                         ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[0]
+            if entry:
+                del self._memory[key]
+
+        try:
+            row = self.db.fetchone('SELECT value, created_at FROM generation_cache WHERE cache_key = ?', (key,))
+            if row and now - row[1] >= self.ttl_seconds:
+                self.db.execute('DELETE FROM generation_cache WHERE cache_key = ?', (key,))
+                row = None
+        except sqlite3.Error as e:
+            print(f"[GenerationCache] Ошибка чтения кэша: {e}")
+            row = None
+
+        with self._lock:
+            if row:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self._stats["db_hits"] += 1
+                return value
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key: str, stage: str, value: dict):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, value, created_at)
+
+        try:
+            self.db.execute('''
+                INSERT OR REPLACE INTO generation_cache (cache_key, stage, value, created_at)
+                VALUES (?, ?, ?, ?)
+            ''', (key, stage, json.dumps(value, ensure_ascii=False), created_at))
+        except sqlite3.Error as e:
+            print(f"[GenerationCache] Ошибка записи кэша: {e}")
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_size"] = len(self._memory)
+        hits = stats["memory_hits"] + stats["db_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        return stats
+
+
+class CachedRequirementAnalysisService(IRequirementAnalysysService):
+    def __init__(self, service, cache: GenerationCache):
+        self.service = service
+        self.cache = cache
+
+    def _key(self, requirement) -> str:
+        return self.cache.make_key("analysis", requirement.input_text,
+                                   model=self.service.router.model_name,
+                                   temperature=self.service.TEMPERATURE)
+
+    def _lookup(self, key: str, use_cache: bool) -> Optional[StructuredModel]:
+        if not use_cache:
+            self.cache.record_bypass()
+            return None
+        cached = self.cache.get(key)
+        return StructuredModel(**cached) if cached else None
+
+    def _store(self, key: str, structured: StructuredModel):
+        if not structured.failed:
+            self.cache.set(key, "analysis", {
+                "functional_description": structured.functional_description,
+                "target_language": structured.target_language,
+                "entities": structured.entities
+            })
+
+    def analyze(self, requirement, use_cache: bool = True) -> StructuredModel:
+        key = self._key(requirement)
+        cached = self._lookup(key, use_cache)
+        if cached:
+            return cached
+
+        structured = self.service.analyze(requirement)
+        self._store(key, structured)
+        return structured
+
+
+class AsyncCachedRequirementAnalysisService(CachedRequirementAnalysisService):
+    async def analyze(self, requirement, use_cache: bool = True) -> StructuredModel:
+        key = self._key(requirement)
+        cached = self._lookup(key, use_cache)
+        if cached:
+            return cached
+
+        structured = await self.service.analyze(requirement)
+        self._store(key, structured)
+        return structured
+
+
+class CachedCodeGenerationService(ICodeGenerationService):
+    def __init__(self, service, cache: GenerationCache):
+        self.service = service
+        self.cache = cache
+
+    def _key(self, structured: StructuredModel, with_comments: bool) -> str:
+        text = f"{structured.functional_description}\n{json.dumps(structured.entities, ensure_ascii=False, sort_keys=True, default=str)}"
+        return self.cache.make_key("generation", text, structured.target_language, with_comments,
+                                   model=self.service.router.model_name,
+                                   temperature=self.service.TEMPERATURE)
+
+    def _lookup(self, key: str, use_cache: bool) -> Optional[dict]:
+        if not use_cache:
+            self.cache.record_bypass()
+            return None
+        return self.cache.get(key)
+
+    def _from_cache(self, structured: StructuredModel, with_comments: bool, cached: dict) -> GeneratedCode:
+        return GeneratedCode(
+            name="Generated",
+            language=structured.target_language,
+            code_body=cached["code_body"],
+            has_comments=with_comments
+        )
+
+    def _store(self, key: str, generated: GeneratedCode):
+        if not generated.failed:
+            self.cache.set(key, "generation", {"code_body": generated.code_body})
+
+    def generateCode(self, structured: StructuredModel, with_comments: bool = False,
+                     use_cache: bool = True) -> GeneratedCode:
+        key = self._key(structured, with_comments)
+        cached = self._lookup(key, use_cache)
+        if cached:
+            return self._from_cache(structured, with_comments, cached)
+
+        generated = self.service.generateCode(structured, with_comments)
+        self._store(key, generated)
+        return generated
+
+    def generateCodeStream(self, structured: StructuredModel, with_comments: bool = False,
+                           use_cache: bool = True):
+        key = self._key(structured, with_comments)
+        cached = self._lookup(key, use_cache)
+        if cached:
+            yield cached["code_body"]
+            return
+
+        parts = []
+        failed = False
+        for chunk in self.service.generateCodeStream(structured, with_comments):
+            failed = failed or chunk.startswith(self.service.ERROR_PREFIX)
+            parts.append(chunk)
+            yield chunk
+
+        code = "".join(parts).strip()
+        if code and not failed:
+            self.cache.set(key, "generation", {"code_body": code})
+
+
+class AsyncCachedCodeGenerationService(CachedCodeGenerationService):
+    async def generateCode(self, structured: StructuredModel, with_comments: bool = False,
+                           use_cache: bool = True) -> GeneratedCode:
+        key = self._key(structured, with_comments)
+        cached = self._lookup(key, use_cache)
+        if cached:
+            return self._from_cache(structured, with_comments, cached)
+
+        generated = await self.service.generateCode(structured, with_comments)
+        self._store(key, generated)
+        return generated
@@ -1,18 +1,38 @@
+import asyncio
 import traceback
-import random
+import re
+import time
+from config import Config
+from .jobs import JobEventWriter, JobWorkerPool
 from .views.code_view import CodeDisplayView
 from .views.requirement_view import RequirementInputView
 from .views.validation_view import ValidationResultView
 
 
 class GenerationOrchestrator:
-    def __init__(self, user_repository, projects_repository):
+    def __init__(self, user_repository, projects_repository, jobs_repository, result_store):
         self.user_repository = user_repository
         self.projects_repository = projects_repository
-        
-        self.validation_view = ValidationResultView()
-        self.requirement_view = RequirementInputView()
-        self.code_view = CodeDisplayView()
+        self.jobs_repository = jobs_repository
+        # результаты живут в хранилище по result_id, а не в общих представлениях,
+        # поэтому параллельные запросы разных пользователей не мешают друг другу
+        self.result_store = result_store
+
+        # пулы разделены, чтобы медленная оптимизация не занимала воркеры основного конвейера
+        self.pipeline_pool = JobWorkerPool(
+            jobs_repository,
+            {"generation": self.run_generation_job},
+            workers=Config.PIPELINE_WORKERS
+        )
+        self.job_pool = JobWorkerPool(
+            jobs_repository,
+            {"optimize": self.run_optimization_job},
+            workers=Config.OPTIMIZE_WORKERS
+        )
+
+    def start_workers(self):
+        self.pipeline_pool.start()
+        self.job_pool.start()
     
     def validate_session_user(self, session):
         if 'user_id' not in session or 'username' not in session:
@@ -101,6 +121,126 @@ class GenerationOrchestrator:
                 "message": "Ошибка при обновлении данных"
             }
     
+    DEMO_PROJECTS = [
+        {
+            'name': 'Первое приложение',
+            'description': 'Добро пожаловать в CodeGen AI! Это ваш первый проект.',
+            'language': 'Python',
+            'framework': 'None',
+            'status': 'completed',
+            'files': {
+                'main.py': (
+                    'def greet(name: str) -> str:\n'
+                    '    return f"Привет, {name}!"\n'
+                    '\n'
+                    '\n'
+                    'if __name__ == "__main__":\n'
+                    '    print(greet("CodeGen AI"))\n'
+                )
+            }
+        },
+        {
+            'name': 'Демо API',
+            'description': 'Пример REST API для обучения',
+            'language': 'TypeScript',
+            'framework': 'Express.js',
+            'status': 'draft',
+            'files': {
+                'main.ts': (
+                    "import express from 'express';\n"
+                    '\n'
+                    'const app = express();\n'
+                    'app.use(express.json());\n'
+                    '\n'
+                    "app.get('/api/items', (req, res) => {\n"
+                    '    res.json([]);\n'
+                    '});\n'
+                    '\n'
+                    'app.listen(3000);\n'
+                )
+            }
+        }
+    ]
+
+    def validate_registration(self, data, require_confirmation=True):
+        required_fields = ['username', 'email', 'password', 'role']
+        if require_confirmation:
+            required_fields.insert(3, 'confirm_password')
+        for field in required_fields:
+            if field not in data or not str(data[field]).strip():
+                return f"Поле '{field}' обязательно для заполнения"
+        
+        if require_confirmation and data['password'] != data['confirm_password']:
+            return "Пароли не совпадают"
+        
+        username_regex = r'^[a-zA-Z0-9_.-]{3,20}$'
+        if not re.match(username_regex, data['username']):
+            return "Имя пользователя должно содержать от 3 до 20 символов (латинские буквы, цифры, _ . -)"
+        
+        email_regex = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
+        if not re.match(email_regex, data['email']):
+            return "Введите корректный email адрес"
+        
+        if len(data['password']) < 6:
+            return "Пароль должен содержать минимум 6 символов"
+
+        if data['role'] not in ('DEVELOPER', 'SYSTEM_ANALYST', 'STUDENT'):
+            return "Недопустимая роль"
+        
+        return None
+
+    def demo_projects_for(self, user_id):
+        # счетчики строк и файлов посчитает хранилище артефактов по самим файлам
+        for project in self.DEMO_PROJECTS:
+            yield user_id, project
+
+    def register_user(self, data):
+        # пользователь создается одной транзакцией, демо-проекты - одной пакетной вставкой;
+        # базы пользователей и проектов - разные файлы, поэтому при ошибке второго шага
+        # пользователь удаляется, чтобы не осталось полузарегистрированной записи
+        created = self.user_repository.create_users([{
+            "username": data['username'],
+            "password": data['password'],
+            "email": data['email'],
+            "full_name": data.get('full_name'),
+            "role": data['role']
+        }])
+        if not created:
+            return {
+                "success": False,
+                "exists": True,
+                "message": "Пользователь с таким именем уже существует"
+            }
+
+        user_id = created[0]['id']
+        try:
+            self.projects_repository.create_projects_bulk(self.demo_projects_for(user_id))
+        except Exception as e:
+            print(f"Ошибка создания демо-проектов: {e}")
+            self.user_repository.delete_user(user_id)
+            return {
+                "success": False,
+                "message": "Ошибка при создании пользователя"
+            }
+
+        return {
+            "success": True,
+            "message": "Регистрация успешна! Теперь вы можете войти в систему."
+        }
+
+    def resolve_user(self, session_data):
+        from core.models import User, UserRole
+
+        role_mapping = {
+            "DEVELOPER": UserRole.DEVELOPER,
+            "SYSTEM_ANALYST": UserRole.SYSTEM_ANALYST,
+            "STUDENT": UserRole.STUDENT,
+            "ADMIN": UserRole.ADMIN
+        }
+
+        user_role = role_mapping.get(session_data.get('role', 'DEVELOPER'), UserRole.DEVELOPER)
+        return User(session_data.get('username', 'unknown'), user_role)
+
     def handleGenerationRequest(self, requirement_data, session_data):
         try:
             print(f"\nНачало генерации")
@@ -114,33 +254,31 @@ class GenerationOrchestrator:
             if not requirement_text:
                 return {"error": "Введите требование!"}
             
-            self.requirement_view.set_data(requirement_text, language)
-            
             try:
                 from core.di import DependencyInjector
-                from core.models import RequirementModel, User, UserRole
+                from core.models import RequirementModel, UserRole
                 
-                role_mapping = {
-                    "DEVELOPER": UserRole.DEVELOPER,
-                    "SYSTEM_ANALYST": UserRole.SYSTEM_ANALYST,
-                    "STUDENT": UserRole.STUDENT
-                }
-                
-                user_role = role_mapping.get(session_data.get('role', 'DEVELOPER'), UserRole.DEVELOPER)
-                user = User(session_data.get('username', 'unknown'), user_role)
+                user = self.resolve_user(session_data)
+                user_role = user.role
+
+                use_cache = not requirement_data.get("freshSample", False)
 
                 requirement = RequirementModel(requirement_text)
-                structured = DependencyInjector.get("analysis").analyze(requirement)
+                structured = DependencyInjector.get("analysis").analyze(requirement, use_cache=use_cache)
                 structured.target_language = language
 
                 with_comments = user_role == UserRole.STUDENT
-                generated = DependencyInjector.get("generation").generateCode(structured, with_comments)
+                if requirement_data.get("hedged"):
+                    hedged = DependencyInjector.get("generation_hedged").generateCode(structured, with_comments)
+                    generated = DependencyInjector.get("async_runtime").run(hedged)
+                else:
+                    generated = DependencyInjector.get("generation").generateCode(structured, with_comments, use_cache=use_cache)
 
                 DependencyInjector.get("validation").validate(generated)
+                result_id = self.save_result(requirement_text, generated, session_data)
+                optimization_job_id = None
                 if "optimize" in user.get_permissions():
-                    DependencyInjector.get("validation").optimize(generated)
-                
-                self.code_view.set_code(generated.code_body, generated.language)
+                    optimization_job_id = self.enqueue_optimization(generated, session_data, result_id)
                 
                 print(f"Генерация кода завершена")
                 
@@ -148,7 +286,9 @@ class GenerationOrchestrator:
                     "code": generated.code_body,
                     "language": generated.language,
                     "status": generated.validation_status.value,
-                    "generated_by": session_data.get('username')
+                    "generated_by": session_data.get('username'),
+                    "optimization_job_id": optimization_job_id,
+                    "result_id": result_id
                 }
                 
             except ImportError as e:
@@ -164,8 +304,6 @@ class GenerationOrchestrator:
                 if __name__ == "__main__":
                     main()"""
                 
-                self.code_view.set_code(test_code, language)
-                
                 return {
                     "code": test_code,
                     "language": language,
@@ -183,6 +321,253 @@ class GenerationOrchestrator:
                 "traceback": traceback.format_exc()[-500:]  
             }
     
+    async def handleGenerationRequestAsync(self, requirement_data, session_data):
+        from core.di import DependencyInjector
+
+        # конвейер целиком выполняется в общем цикле событий AsyncRuntime,
+        # где живут асинхронные клиенты и глобальный семафор
+        runtime = DependencyInjector.get("async_runtime")
+        return await runtime.call(self._generate_async(requirement_data, session_data))
+
+    async def _generate_async(self, requirement_data, session_data):
+        requirement_text = requirement_data.get("requirement", "").strip()
+        language = requirement_data.get("language", "Python")
+
+        if not requirement_text:
+            return {"error": "Введите требование!"}
+
+        try:
+            from core.di import DependencyInjector
+            from core.models import RequirementModel, UserRole
+
+            user = self.resolve_user(session_data)
+            use_cache = not requirement_data.get("freshSample", False)
+
+            requirement = RequirementModel(requirement_text)
+            structured = await DependencyInjector.get("analysis_async").analyze(requirement, use_cache=use_cache)
+            structured.target_language = language
+
+            with_comments = user.role == UserRole.STUDENT
+            if requirement_data.get("hedged"):
+                generated = await DependencyInjector.get("generation_hedged").generateCode(structured, with_comments)
+            else:
+                generated = await DependencyInjector.get("generation_async").generateCode(
+                    structured, with_comments, use_cache=use_cache)
+
+            DependencyInjector.get("validation_async").validate(generated)
+            result_id = await asyncio.to_thread(self.save_result, requirement_text, generated, session_data)
+            optimization_job_id = None
+            if "optimize" in user.get_permissions():
+                optimization_job_id = await asyncio.to_thread(
+                    self.enqueue_optimization, generated, session_data, result_id)
+
+            return {
+                "code": generated.code_body,
+                "language": generated.language,
+                "status": generated.validation_status.value,
+                "generated_by": session_data.get('username'),
+                "optimization_job_id": optimization_job_id,
+                "result_id": result_id
+            }
+
+        except Exception as e:
+            print(f"Критическая ошибка в асинхронной генерации: {e}")
+            print(traceback.format_exc())
+
+            return {
+                "error": f"Ошибка генерации: {str(e)}",
+                "traceback": traceback.format_exc()[-500:]
+            }
+
+    def handleGenerationStream(self, requirement_data, session_data):
+        requirement_text = requirement_data.get("requirement", "").strip()
+        language = requirement_data.get("language", "Python")
+
+        if not requirement_text:
+            yield "error", {"error": "Введите требование!"}
+            return
+
+        try:
+            from core.di import DependencyInjector
+            from core.models import RequirementModel, GeneratedCode, UserRole
+
+            user = self.resolve_user(session_data)
+            user_role = user.role
+
+            use_cache = not requirement_data.get("freshSample", False)
+
+            requirement = RequirementModel(requirement_text)
+            structured = DependencyInjector.get("analysis").analyze(requirement, use_cache=use_cache)
+            structured.target_language = language
+            yield "analysis", {
+                "functional_description": structured.functional_description,
+                "language": language,
+                "entities": structured.entities
+            }
+
+            with_comments = user_role == UserRole.STUDENT
+            parts = []
+            for chunk in DependencyInjector.get("generation").generateCodeStream(structured, with_comments, use_cache=use_cache):
+                parts.append(chunk)
+                yield "token", {"text": chunk}
+
+            generated = GeneratedCode(
+                name="Generated",
+                language=language,
+                code_body="".join(parts).strip(),
+                has_comments=with_comments
+            )
+            DependencyInjector.get("validation").validate(generated)
+            result_id = self.save_result(requirement_text, generated, session_data)
+            optimization_job_id = None
+            if "optimize" in user.get_permissions():
+                optimization_job_id = self.enqueue_optimization(generated, session_data, result_id)
+
+            yield "done", {
+                "code": generated.code_body,
+                "language": generated.language,
+                "status": generated.validation_status.value,
+                "generated_by": session_data.get('username'),
+                "optimization_job_id": optimization_job_id,
+                "result_id": result_id
+            }
+
+        except Exception as e:
+            print(f"Критическая ошибка в потоковой генерации: {e}")
+            print(traceback.format_exc())
+            yield "error", {"error": f"Ошибка генерации: {str(e)}"}
+
+    def enqueue_generation(self, requirement_data, session_data, stream=False):
+        requirement_data = requirement_data or {}
+        if not str(requirement_data.get("requirement", "")).strip():
+            return {"error": "Введите требование!"}
+
+        job_id = self.pipeline_pool.enqueue("generation", session_data.get('user_id'), {
+            "requirement_data": requirement_data,
+            "session_data": {
+                "user_id": session_data.get('user_id'),
+                "username": session_data.get('username'),
+                "role": session_data.get('role'),
+                "session_id": session_data.get('session_id')
+            },
+            "stream": stream
+        })
+        return {"job_id": job_id}
+
+    def run_generation_job(self, payload, job_id=None):
+        requirement_data, session_data = payload["requirement_data"], payload["session_data"]
+        # в параллельном режиме выигрывает целый вариант, поэтому фрагменты публикуются только для обычного
+        if payload.get("stream") and not requirement_data.get("hedged"):
+            return self.run_streamed_generation(job_id, requirement_data, session_data)
+
+        result = self.handleGenerationRequest(requirement_data, session_data)
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        return result
+
+    def run_streamed_generation(self, job_id, requirement_data, session_data):
+        writer = JobEventWriter(self.jobs_repository, job_id)
+        for event, data in self.handleGenerationStream(requirement_data, session_data):
+            if event == "done":
+                writer.flush()
+                return data
+            if event == "error":
+                raise RuntimeError(data["error"])
+            writer.emit(event, data)
+        raise RuntimeError("Генерация завершилась без результата")
+
+    def watch_job(self, job_id, user_id):
+        deadline = time.time() + Config.JOB_WATCH_TIMEOUT
+        last_status = None
+
+        while time.time() < deadline:
+            job = self.jobs_repository.get_job(job_id, user_id)
+            if not job:
+                yield "error", {"error": "Задача не найдена"}
+                return
+
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield "status", {"status": last_status}
+
+            if last_status in ("done", "failed"):
+                yield last_status, job
+                return
+
+            time.sleep(Config.JOB_POLL_INTERVAL)
+
+        yield "timeout", {"status": last_status}
+
+    def stream_job(self, job_id, user_id):
+        # события задачи пересказываются в формате потоковой генерации: analysis, token, done/error
+        deadline = time.time() + Config.JOB_WATCH_TIMEOUT
+        last_status = None
+        last_event_id = 0
+
+        while time.time() < deadline:
+            job = self.jobs_repository.get_job(job_id, user_id)
+            if not job:
+                yield "error", {"error": "Задача не найдена"}
+                return
+
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield "status", {"status": last_status, "job_id": job_id}
+
+            for event_id, event, data in self.jobs_repository.get_events(job_id, last_event_id):
+                last_event_id = event_id
+                yield event, data
+
+            if last_status == "done":
+                yield "done", job['result']
+                return
+            if last_status == "failed":
+                yield "error", {"error": job['error'] or "Ошибка генерации"}
+                return
+
+            time.sleep(Config.JOB_STREAM_POLL_INTERVAL)
+
+        yield "timeout", {"status": last_status, "job_id": job_id}
+
+    def save_result(self, requirement_text, generated, session_data):
+        return self.result_store.save(session_data.get('user_id'), session_data.get('session_id'),
+                                      requirement_text, generated)
+
+    def enqueue_optimization(self, generated, session_data, result_id=None):
+        return self.job_pool.enqueue("optimize", session_data.get('user_id'), {
+            "code": generated.code_body,
+            "language": generated.language,
+            "has_comments": generated.has_comments,
+            "result_id": result_id
+        })
+
+    def run_optimization_job(self, payload, job_id=None):
+        from core.di import DependencyInjector
+        from core.models import GeneratedCode, ValidationStatus
+
+        generated = GeneratedCode(
+            code_body=payload["code"],
+            name="Generated",
+            language=payload["language"],
+            has_comments=payload.get("has_comments", False)
+        )
+        DependencyInjector.get("validation").optimize(generated)
+        if generated.validation_status != ValidationStatus.OPTIMIZED:
+            raise RuntimeError("Оптимизация не удалась")
+
+        if payload.get("result_id"):
+            self.result_store.record_optimization(payload["result_id"], generated.code_body,
+                                                  generated.validation_status.value)
+
+        return {
+            "code": generated.code_body,
+            "language": generated.language,
+            "status": generated.validation_status.value
+        }
+
+    def get_job(self, job_id, user_id):
+        return self.jobs_repository.get_job(job_id, user_id)
+
     def on_save_button_click(self, project_data, user_id):
           
         required_fields = ['name', 'language', 'framework']
@@ -193,20 +578,26 @@ class GenerationOrchestrator:
                     "message": f"Поле '{field}' обязательно для заполнения"
                 }
         
+        # код из результата генерации сохраняется первой версией проекта
+        files, result_id = None, project_data.get('result_id')
+        if result_id:
+            result = self.result_store.get(result_id, user_id)
+            if not result:
+                return {
+                    "success": False,
+                    "message": "Результат генерации не найден или устарел"
+                }
+            files = {self.projects_repository.artifacts.file_name_for(result['language']): result['code']}
+
         project_id = self.projects_repository.create_project(
             user_id=user_id,
             name=project_data['name'].strip(),
             description=project_data.get('description', '').strip(),
             language=project_data['language'].strip(),
             framework=project_data['framework'].strip(),
-            status=project_data.get('status', 'draft')
-        )
-        
-        self.projects_repository.update_project(
-            project_id=project_id,
-            user_id=user_id,
-            lines_of_code=random.randint(100, 1500),
-            files_count=random.randint(3, 20)
+            status=project_data.get('status', 'draft'),
+            files=files,
+            result_id=result_id
         )
         
         return {
@@ -215,11 +606,52 @@ class GenerationOrchestrator:
             "project_id": project_id
         }
     
-    def get_validation_view(self):
-        return self.validation_view
+    def save_project_version(self, project_id, data, user_id):
+        result_id = data.get('result_id')
+        if result_id:
+            result = self.result_store.get(result_id, user_id)
+            if not result:
+                return {"success": False, "message": "Результат генерации не найден или устарел"}
+            files = {self.projects_repository.artifacts.file_name_for(result['language']): result['code']}
+        else:
+            files = data.get('files')
+            if not files or not self.projects_repository.artifacts.valid_files(files):
+                return {"success": False, "message": "Передайте result_id или непустой словарь files"}
+
+        version = self.projects_repository.artifacts.add_version(project_id, user_id, files, result_id)
+        if not version:
+            return {"success": False, "message": "Проект не найден или нет прав"}
+        return {"success": True, "message": "Версия сохранена", **version}
+
+    def find_result(self, user_id, session_id, result_id=None):
+        if result_id:
+            return self.result_store.get(result_id, user_id)
+        return self.result_store.latest(user_id, session_id)
+
+    def get_validation_view(self, user_id, session_id, result_id=None):
+        result = self.find_result(user_id, session_id, result_id)
+        if result_id and not result:
+            return None
+
+        view = ValidationResultView()
+        if result:
+            view.display_errors(result['errors'])
+            view.display_optimizations(result['optimizations'])
+        return view
     
-    def get_requirement_view(self):
-        return self.requirement_view
+    def get_requirement_view(self, user_id, session_id, result_id=None):
+        result = self.find_result(user_id, session_id, result_id)
+        view = RequirementInputView()
+        if result:
+            view.set_data(result['requirement_text'], result['language'])
+        return view
     
-    def get_code_view(self):
-        return self.code_view
+    def get_code_view(self, user_id, session_id, result_id=None):
+        result = self.find_result(user_id, session_id, result_id)
+        if result_id and not result:
+            return None
+
+        view = CodeDisplayView()
+        if result:
+            view.set_code(result['code'], result['language'])
+        return view
@@ -1,7 +1,20 @@
+import os
+import threading
+import time
+
+from .llm_router import LLMRouter
+from .budget import TokenBudgetEstimator
 from .services import RequirementAnalysisService, CodeGenerationService, ValidationService
+from .cache import GenerationCache, CachedRequirementAnalysisService, CachedCodeGenerationService
+from .cache import AsyncCachedRequirementAnalysisService, AsyncCachedCodeGenerationService
+from .async_services import AsyncRuntime, AsyncRequirementAnalysisService, AsyncCodeGenerationService, AsyncValidationService
+from .hedging import HedgedCodeGenerationService
+from .singleflight import SingleFlight, SingleFlightAnalysisService, SingleFlightGenerationService, SingleFlightValidationService
 
 class DependencyInjector:
     _services = {}
+    _pid = None
+    _lock = threading.Lock()
     
     @classmethod
     def register(cls, name: str, service):
@@ -9,12 +22,48 @@ class DependencyInjector:
     
     @classmethod
     def get(cls, name: str):
+        cls.ensure_initialized()
         return cls._services.get(name)
+
+    @classmethod
+    def ensure_initialized(cls):
+        # клиенты, пулы соединений и фоновые потоки не переживают fork,
+        # поэтому каждый процесс собирает свой набор сервисов при первом обращении
+        pid = os.getpid()
+        if cls._pid == pid:
+            return
+        with cls._lock:
+            if cls._pid == pid:
+                return
+            started = time.perf_counter()
+            cls._services = {}
+            cls.init()
+            cls._pid = pid
+            print(f"[DependencyInjector] Сервисы собраны за {(time.perf_counter() - started) * 1000:.0f} мс (pid {pid})")
     
     @classmethod
     def init(cls):
-        cls.register("analysis", RequirementAnalysisService())
-        cls.register("generation", CodeGenerationService())
-        cls.register("validation", ValidationService())
+        router = LLMRouter.from_config()
+        router.start_health_checks()
+        cache = GenerationCache()
+        flight = SingleFlight()
+        budget = TokenBudgetEstimator()
+        cls.register("router", router)
+        cls.register("budget", budget)
+        cls.register("cache", cache)
+        cls.register("singleflight", flight)
+        cls.register("analysis", SingleFlightAnalysisService(
+            CachedRequirementAnalysisService(RequirementAnalysisService(router, budget), cache), flight))
+        cls.register("generation", SingleFlightGenerationService(
+            CachedCodeGenerationService(CodeGenerationService(router, budget), cache), flight))
+        cls.register("validation", SingleFlightValidationService(ValidationService(router, budget), flight))
 
-DependencyInjector.init()
+        runtime = AsyncRuntime()
+        cls.register("async_runtime", runtime)
+        cls.register("analysis_async", AsyncCachedRequirementAnalysisService(
+            AsyncRequirementAnalysisService(router, budget, runtime), cache))
+        generation_async = AsyncCodeGenerationService(router, budget, runtime)
+        validation_async = AsyncValidationService(router, budget, runtime)
+        cls.register("generation_async", AsyncCachedCodeGenerationService(generation_async, cache))
+        cls.register("validation_async", validation_async)
+        cls.register("generation_hedged", HedgedCodeGenerationService(generation_async, validation_async))
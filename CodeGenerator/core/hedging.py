@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from config import Config
+from .models import StructuredModel, GeneratedCode, ValidationStatus
+from .async_services import IAsyncCodeGenerationService
+
+
+class LatencyTracker:
+    MIN_SAMPLES = 20
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self, default: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.MIN_SAMPLES:
+            return default
+        return samples[int(len(samples) * 0.95) - 1]
+
+
+class HedgedCodeGenerationService(IAsyncCodeGenerationService):
+    # Запускает несколько попыток генерации параллельно (разные температуры, роутер
+    # разводит их по разным бэкендам), возвращает первую валидную и отменяет остальные.
+    # Если основная попытка дольше p95, запускается еще одна, резервная
+    def __init__(self, service, validation, parallel: int = Config.HEDGED_PARALLEL,
+                 temperatures: list = Config.HEDGED_TEMPERATURES,
+                 default_delay: float = Config.HEDGED_DEFAULT_DELAY):
+        self.service = service
+        self.validation = validation
+        self.parallel = max(1, parallel)
+        self.temperatures = temperatures
+        self.default_delay = default_delay
+        self.latency = LatencyTracker()
+
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "attempts": 0, "backups": 0, "cancelled": 0,
+                       "valid": 0, "no_valid": 0, "wins_by_attempt": {}}
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    async def _attempt(self, structured: StructuredModel, with_comments: bool, temperature: float):
+        started = time.monotonic()
+        generated = await self.service.generateCode(structured, with_comments, temperature=temperature)
+        if not generated.failed:
+            self.latency.record(time.monotonic() - started)
+        self.validation.validate(generated)
+        return generated
+
+    async def generateCode(self, structured: StructuredModel, with_comments: bool = False) -> GeneratedCode:
+        self._count("requests")
+        tasks = {}
+
+        def launch():
+            index = len(tasks)
+            temperature = self.temperatures[index % len(self.temperatures)]
+            task = asyncio.ensure_future(self._attempt(structured, with_comments, temperature))
+            tasks[task] = index
+            self._count("attempts")
+
+        for _ in range(self.parallel):
+            launch()
+
+        backup_delay = self.latency.p95(self.default_delay)
+        backup_fired = False
+        pending = set(tasks)
+        finished = []
+
+        try:
+            while pending:
+                timeout = None if backup_fired else backup_delay
+                done, pending = await asyncio.wait(pending, timeout=timeout,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    backup_fired = True
+                    self._count("backups")
+                    launch()
+                    pending = {task for task in tasks if not task.done()}
+                    continue
+
+                for task in sorted(done, key=lambda t: tasks[t]):
+                    if task.exception():
+                        continue
+                    generated = task.result()
+                    finished.append(generated)
+                    # текст ошибки генерации для не-Python кода тоже проходит проверку как VALID
+                    if not generated.failed and generated.validation_status == ValidationStatus.VALID:
+                        self._count("valid")
+                        with self._lock:
+                            wins = self._stats["wins_by_attempt"]
+                            wins[tasks[task]] = wins.get(tasks[task], 0) + 1
+                        return generated
+        finally:
+            # отмена закрывает HTTP-потоки, бэкенды сразу освобождаются
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    self._count("cancelled")
+
+        self._count("no_valid")
+        if finished:
+            return next((g for g in finished if not g.failed), finished[0])
+        raise RuntimeError("Ни одна попытка генерации не завершилась")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["wins_by_attempt"] = dict(self._stats["wins_by_attempt"])
+        stats["backup_delay"] = round(self.latency.p95(self.default_delay), 2)
+        return stats
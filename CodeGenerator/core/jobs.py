@@ -0,0 +1,84 @@
+import threading
+import time
+import traceback
+
+from config import Config
+
+
+class JobWorkerPool:
+    def __init__(self, jobs_repository, handlers: dict, workers: int = 2,
+                 lease_seconds: int = Config.JOB_LEASE_SECONDS,
+                 poll_interval: float = Config.JOB_POLL_INTERVAL):
+        self.jobs_repository = jobs_repository
+        self.handlers = handlers
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def enqueue(self, kind: str, user_id: str, payload: dict) -> str:
+        job_id = self.jobs_repository.create_job(kind, user_id, payload)
+        self._wakeup.set()
+        return job_id
+
+    def _run(self):
+        kinds = list(self.handlers)
+        while True:
+            try:
+                job = self.jobs_repository.claim_next_job(kinds, self.lease_seconds)
+            except Exception as e:
+                print(f"[JobWorkerPool] Ошибка получения задачи: {e}")
+                job = None
+
+            if not job:
+                # другие процессы тоже пишут в очередь, поэтому кроме сигнала есть опрос по таймауту
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                result = self.handlers[job["kind"]](job["payload"], job["id"])
+                self.jobs_repository.complete_job(job["id"], result)
+            except Exception as e:
+                print(f"[JobWorkerPool] Задача {job['id']} ({job['kind']}) завершилась ошибкой: {e}")
+                print(traceback.format_exc())
+                self.jobs_repository.fail_job(job["id"], str(e))
+
+
+class JobEventWriter:
+    def __init__(self, jobs_repository, job_id: str,
+                 flush_interval_ms: int = Config.JOB_EVENT_FLUSH_MS):
+        self.jobs_repository = jobs_repository
+        self.job_id = job_id
+        self.flush_interval = flush_interval_ms / 1000
+
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def emit(self, event: str, payload: dict):
+        # фрагменты кода склеиваются, чтобы не писать в базу строку на каждый токен
+        if event == "token" and self._pending and self._pending[-1][0] == "token":
+            self._pending[-1][1]["text"] += payload["text"]
+        else:
+            self._pending.append((event, dict(payload)))
+
+        if event != "token" or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.jobs_repository.append_events(self.job_id, self._pending)
+            self._pending = []
+        self._last_flush = time.monotonic()
@@ -0,0 +1,190 @@
+import threading
+import time
+
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APITimeoutError
+
+from config import Config
+
+
+class LLMBackend:
+    def __init__(self, base_url: str, model: str, api_key: str = "ollama"):
+        self.base_url = base_url
+        self.model = model
+        self.api_key = api_key
+        self.client = OpenAI(base_url=base_url, api_key=api_key)
+        self._async_client = None
+
+        self.outstanding = 0
+        self.total_requests = 0
+        self.failures = 0
+        self.healthy = True
+        self.last_error = None
+        self.last_check = None
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        # создается лениво внутри цикла событий AsyncRuntime, пул соединений общий для всех задач
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(base_url=self.base_url, api_key=self.api_key)
+        return self._async_client
+
+    def to_dict(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "total_requests": self.total_requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_check": self.last_check
+        }
+
+
+class LLMRouter:
+    def __init__(self, backends, health_interval: float = Config.LLM_HEALTH_INTERVAL,
+                 health_timeout: float = Config.LLM_HEALTH_TIMEOUT):
+        if not backends:
+            raise ValueError("Не настроен ни один LLM бэкенд")
+
+        self.backends = backends
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    @classmethod
+    def from_config(cls):
+        return cls([LLMBackend(item["base_url"], item["model"]) for item in Config.OLLAMA_BACKENDS])
+
+    @property
+    def model_name(self) -> str:
+        return "+".join(sorted({backend.model for backend in self.backends}))
+
+    def chat(self, messages, **kwargs):
+        tried = set()
+        while True:
+            backend = self._acquire(tried)
+            tried.add(backend)
+            try:
+                response = backend.client.chat.completions.create(
+                    model=backend.model,
+                    messages=messages,
+                    **kwargs
+                )
+            except (APIConnectionError, APITimeoutError) as e:
+                self._release(backend)
+                self.mark_down(backend, e)
+                if len(tried) >= len(self.backends):
+                    raise
+                continue
+            except Exception:
+                self._release(backend)
+                raise
+
+            if kwargs.get("stream"):
+                return self._release_after_stream(backend, response)
+
+            self._release(backend)
+            return response
+
+    async def achat(self, messages, **kwargs):
+        tried = set()
+        while True:
+            backend = self._acquire(tried)
+            tried.add(backend)
+            try:
+                response = await backend.async_client.chat.completions.create(
+                    model=backend.model,
+                    messages=messages,
+                    **kwargs
+                )
+            except (APIConnectionError, APITimeoutError) as e:
+                self._release(backend)
+                self.mark_down(backend, e)
+                if len(tried) >= len(self.backends):
+                    raise
+                continue
+            except BaseException:
+                self._release(backend)
+                raise
+
+            if kwargs.get("stream"):
+                return self._release_after_async_stream(backend, response)
+
+            self._release(backend)
+            return response
+
+    def _acquire(self, exclude) -> LLMBackend:
+        with self._lock:
+            candidates = [b for b in self.backends if b.healthy and b not in exclude]
+            if not candidates:
+                # если проба считает все бэкенды мертвыми, лучше попробовать, чем сразу отказать
+                candidates = [b for b in self.backends if b not in exclude]
+
+            backend = min(candidates, key=lambda b: (b.outstanding, b.total_requests))
+            backend.outstanding += 1
+            backend.total_requests += 1
+            return backend
+
+    def _release(self, backend: LLMBackend):
+        with self._lock:
+            backend.outstanding -= 1
+
+    def _release_after_stream(self, backend: LLMBackend, stream):
+        # закрытие генератора раньше конца ответа закрывает и HTTP-поток, бэкенд прекращает генерацию
+        try:
+            yield from stream
+        finally:
+            stream.close()
+            self._release(backend)
+
+    async def _release_after_async_stream(self, backend: LLMBackend, stream):
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.close()
+            self._release(backend)
+
+    def mark_down(self, backend: LLMBackend, error):
+        with self._lock:
+            backend.healthy = False
+            backend.failures += 1
+            backend.last_error = str(error)
+        print(f"[LLMRouter] Бэкенд {backend.base_url} исключен из ротации: {error}")
+
+    def start_health_checks(self):
+        with self._lock:
+            if self._health_thread:
+                return
+            self._health_thread = threading.Thread(target=self._health_loop, name="llm-health", daemon=True)
+            self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            for backend in self.backends:
+                self.probe(backend)
+            time.sleep(self.health_interval)
+
+    def probe(self, backend: LLMBackend) -> bool:
+        try:
+            backend.client.with_options(timeout=self.health_timeout, max_retries=0).models.list()
+            healthy, error = True, None
+        except Exception as e:
+            healthy, error = False, str(e)
+
+        with self._lock:
+            if healthy and not backend.healthy:
+                print(f"[LLMRouter] Бэкенд {backend.base_url} снова доступен")
+            elif not healthy and backend.healthy:
+                print(f"[LLMRouter] Бэкенд {backend.base_url} не отвечает: {error}")
+            backend.healthy = healthy
+            backend.last_error = error or backend.last_error
+            backend.last_check = time.time()
+        return healthy
+
+    def get_stats(self) -> list:
+        with self._lock:
+            return [backend.to_dict() for backend in self.backends]
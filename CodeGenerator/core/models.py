@@ -8,6 +8,7 @@ class UserRole(Enum):
     DEVELOPER = "Developer"
     SYSTEM_ANALYST = "System Analyst"
     STUDENT = "Student"
+    ADMIN = "Admin"
 
 class InputType(Enum):
     NATURAL_LANGUAGE = "Natural Language"
@@ -30,7 +31,8 @@ class User:
         perms = {
             UserRole.DEVELOPER: ["generate", "edit", "validate", "optimize"],
             UserRole.SYSTEM_ANALYST: ["analyze", "prototype", "validate"],
-            UserRole.STUDENT: ["generate_with_comments", "learn"]
+            UserRole.STUDENT: ["generate_with_comments", "learn"],
+            UserRole.ADMIN: ["generate", "edit", "validate", "optimize", "provision_users"]
         }
         return perms.get(self.role, [])
 
@@ -47,6 +49,7 @@ class StructuredModel:
         self.functional_description = functional_description
         self.target_language = target_language
         self.entities = entities
+        self.failed = False
 
 class GeneratedCode:
     def __init__(self, code_body: str, name: str,language: str, has_comments: bool = False):
@@ -56,6 +59,7 @@ class GeneratedCode:
         self.language = language
         self.has_comments = has_comments
         self.validation_status = ValidationStatus.PENDING
+        self.failed = False
 
 
 class Project:
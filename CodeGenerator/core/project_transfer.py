@@ -0,0 +1,117 @@
+import json
+import time
+from collections import deque
+
+from config import Config
+from .repo.artifact_repository import ArtifactRepository
+
+
+class ProjectImportReport:
+    REQUIRED_FIELDS = ('name', 'language', 'framework')
+    OPTIONAL_TEXT_FIELDS = ('description', 'status', 'created_at', 'updated_at')
+    MAX_ERRORS = 20
+    MAX_INT = 2 ** 63 - 1
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []
+        self.line_no = 0
+        # номера строк, отданных в текущую, еще не зафиксированную пачку
+        self.pending_lines = deque()
+        self.committed_line = 0
+        self.fatal = None
+
+    def committed(self, count: int):
+        self.imported += count
+        for _ in range(min(count, len(self.pending_lines))):
+            self.committed_line = self.pending_lines.popleft()
+
+    def fail(self, error: Exception):
+        self.fatal = {"line": self.line_no, "error": str(error)}
+
+    def reject(self, line_no: int, message: str):
+        self.skipped += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append({"line": line_no, "error": message})
+
+    def parse(self, lines):
+        # строки разбираются по одной и сразу уходят в пакетную вставку
+        for line_no, line in enumerate(lines, 1):
+            self.line_no = line_no
+            if isinstance(line, bytes):
+                line = line.decode('utf-8', errors='replace')
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self.reject(line_no, "Некорректный JSON")
+                continue
+
+            if not isinstance(record, dict):
+                self.reject(line_no, "Ожидается JSON-объект")
+                continue
+
+            missing = [field for field in self.REQUIRED_FIELDS
+                       if not isinstance(record.get(field), str) or not record[field].strip()]
+            if missing:
+                self.reject(line_no, f"Не заполнены поля: {', '.join(missing)}")
+                continue
+
+            wrong = [field for field in self.OPTIONAL_TEXT_FIELDS
+                     if record.get(field) is not None and not isinstance(record[field], str)]
+            if wrong:
+                self.reject(line_no, f"Поля должны быть строками: {', '.join(wrong)}")
+                continue
+
+            try:
+                record['lines_of_code'] = int(record.get('lines_of_code') or 0)
+                record['files_count'] = int(record.get('files_count') or 0)
+            except (TypeError, ValueError, OverflowError):
+                self.reject(line_no, "lines_of_code и files_count должны быть числами")
+                continue
+            if not (0 <= record['lines_of_code'] <= self.MAX_INT and 0 <= record['files_count'] <= self.MAX_INT):
+                self.reject(line_no, "lines_of_code и files_count вне допустимого диапазона")
+                continue
+
+            if record.get('files') is not None and not ArtifactRepository.valid_files(record['files']):
+                self.reject(line_no, "files должен быть объектом {имя файла: код}")
+                continue
+
+            self.pending_lines.append(line_no)
+            yield record
+
+
+def import_projects_ndjson(projects_repository, user_id, lines,
+                           batch_size: int = Config.IMPORT_BATCH_SIZE) -> dict:
+    report = ProjectImportReport()
+    started = time.perf_counter()
+    try:
+        projects_repository.import_projects(user_id, report.parse(lines), batch_size=batch_size,
+                                            on_batch=report.committed)
+    except Exception as e:
+        # уже зафиксированные пачки остаются в базе: клиент продолжает с resume_from_line
+        print(f"Ошибка импорта проектов на строке {report.line_no}: {e}")
+        report.fail(e)
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "imported": report.imported,
+        "skipped": report.skipped,
+        "errors": report.errors,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(report.imported / elapsed) if elapsed > 0 else report.imported
+    }
+    if report.fatal:
+        result["failed_line"] = report.fatal["line"]
+        result["fatal_error"] = report.fatal["error"]
+        result["resume_from_line"] = report.committed_line + 1
+    return result
+
+
+def export_projects_ndjson(projects_repository, user_id):
+    for project in projects_repository.iter_user_projects(user_id, fetch_size=Config.EXPORT_FETCH_SIZE):
+        yield json.dumps(project, ensure_ascii=False) + "\n"
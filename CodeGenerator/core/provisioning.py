@@ -0,0 +1,85 @@
+import csv
+import secrets
+import time
+
+from config import Config
+
+
+class ProvisioningReport:
+    MAX_ERRORS = 50
+
+    def __init__(self):
+        self.skipped = 0
+        self.errors = []
+        self.credentials = []
+
+    def reject(self, line_no: int, username: str, message: str):
+        self.skipped += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append({"line": line_no, "username": username, "error": message})
+
+    def parse(self, controller, source, default_role: str):
+        # строка 1 - заголовок: username,email,full_name,role,password
+        seen = set()
+        for line_no, row in enumerate(csv.DictReader(source), 2):
+            user = {key.strip(): (value or '').strip() for key, value in row.items() if key}
+            user['role'] = user.get('role') or default_role
+
+            generated = not user.get('password')
+            if generated:
+                user['password'] = secrets.token_urlsafe(9)
+
+            error = controller.validate_registration(user, require_confirmation=False)
+            if error:
+                self.reject(line_no, user.get('username', ''), error)
+                continue
+
+            # повтор имени в файле создал бы одну учетную запись с двумя разными паролями
+            if user['username'] in seen:
+                self.reject(line_no, user['username'], "Имя пользователя повторяется в файле")
+                continue
+            seen.add(user['username'])
+
+            yield line_no, user, generated
+
+
+def provision_users_csv(controller, source, demo_projects: bool = False, default_role: str = "STUDENT",
+                        batch_size: int = Config.PROVISION_BATCH_SIZE) -> dict:
+    report = ProvisioningReport()
+    started = time.perf_counter()
+    created_total = 0
+
+    def flush(batch):
+        created = controller.user_repository.create_users([user for _, user, _ in batch])
+        created_names = {user['username'] for user in created}
+        for line_no, user, generated in batch:
+            if user['username'] not in created_names:
+                report.reject(line_no, user['username'], "Пользователь с таким именем уже существует")
+            elif generated:
+                report.credentials.append({"username": user['username'], "password": user['password']})
+
+        if demo_projects and created:
+            controller.projects_repository.create_projects_bulk(
+                (owned for user in created for owned in controller.demo_projects_for(user['id'])),
+                batch_size=batch_size * len(controller.DEMO_PROJECTS)
+            )
+        return len(created)
+
+    batch = []
+    for entry in report.parse(controller, source, default_role):
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            created_total += flush(batch)
+            batch = []
+    if batch:
+        created_total += flush(batch)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "created": created_total,
+        "skipped": report.skipped,
+        "errors": report.errors,
+        "credentials": report.credentials,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(created_total / elapsed) if elapsed > 0 else created_total
+    }
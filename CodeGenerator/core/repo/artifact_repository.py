@@ -0,0 +1,224 @@
+import hashlib
+import threading
+import zlib
+from typing import List, Optional
+
+from config import Config
+from .database import SQLiteDatabase
+
+
+class ArtifactRepository:
+    FILE_NAMES = {
+        "Python": "main.py",
+        "JavaScript": "main.js",
+        "TypeScript": "main.ts",
+        "Java": "Main.java",
+        "C++": "main.cpp",
+        "Go": "main.go",
+        "Rust": "main.rs"
+    }
+
+    def __init__(self, db_path: str = "data/app_data.db",
+                 compression_level: int = Config.ARTIFACT_COMPRESSION_LEVEL):
+        self.db_path = db_path
+        self.db = SQLiteDatabase.for_path(db_path)
+        self.compression_level = compression_level
+
+        self._lock = threading.Lock()
+        self._stats = {"blobs_written": 0, "blobs_deduplicated": 0, "versions": 0}
+        self.init_database()
+
+    def init_database(self):
+        with self.db.transaction() as cursor:
+            # тело кода хранится один раз на содержимое: ключ - sha256 исходного текста
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS code_blobs (
+                    hash TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL,
+                    lines INTEGER NOT NULL,
+                    body BLOB NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # метаданные версий лежат отдельно от тел, поэтому списки проектов и версий
+            # не читают страницы с blob-данными
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS project_artifacts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    project_id INTEGER NOT NULL,
+                    version INTEGER NOT NULL,
+                    file_name TEXT NOT NULL,
+                    blob_hash TEXT NOT NULL,
+                    result_id TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (project_id, version, file_name),
+                    FOREIGN KEY (project_id) REFERENCES projects (id),
+                    FOREIGN KEY (blob_hash) REFERENCES code_blobs (hash)
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_project_artifacts_blob
+                ON project_artifacts (blob_hash)
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_projects_artifacts_delete
+                AFTER DELETE ON projects
+                BEGIN
+                    DELETE FROM project_artifacts WHERE project_id = OLD.id;
+                END
+            ''')
+            # тело удаляется вместе с последней ссылкой на него
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_project_artifacts_gc
+                AFTER DELETE ON project_artifacts
+                WHEN NOT EXISTS (SELECT 1 FROM project_artifacts WHERE blob_hash = OLD.blob_hash)
+                BEGIN
+                    DELETE FROM code_blobs WHERE hash = OLD.blob_hash;
+                END
+            ''')
+
+    @staticmethod
+    def valid_files(files) -> bool:
+        return isinstance(files, dict) and all(
+            isinstance(name, str) and name.strip() and isinstance(code, str)
+            for name, code in files.items())
+
+    def file_name_for(self, language: str) -> str:
+        return self.FILE_NAMES.get(language, "main.txt")
+
+    def count_lines(self, code: str) -> int:
+        code = code.rstrip("\n")
+        return code.count("\n") + 1 if code else 0
+
+    def put_blob(self, cursor, code: str) -> dict:
+        raw = code.encode("utf-8")
+        blob_hash = hashlib.sha256(raw).hexdigest()
+        lines = self.count_lines(code)
+
+        # сжимаем только новое содержимое: повторная генерация того же кода обходится одним поиском по ключу
+        exists = cursor.execute('SELECT 1 FROM code_blobs WHERE hash = ?', (blob_hash,)).fetchone()
+        if exists:
+            with self._lock:
+                self._stats["blobs_deduplicated"] += 1
+        else:
+            body, codec = zlib.compress(raw, self.compression_level), "zlib"
+            # короткие файлы zlib только раздувает - их храним как есть
+            if len(body) >= len(raw):
+                body, codec = raw, "raw"
+            cursor.execute('''
+                INSERT INTO code_blobs (hash, codec, size, stored_size, lines, body)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (blob_hash, codec, len(raw), len(body), lines, body))
+            with self._lock:
+                self._stats["blobs_written"] += 1
+        return {"hash": blob_hash, "lines": lines}
+
+    def store_version(self, cursor, project_id: int, files: dict, result_id: str = None) -> dict:
+        version = cursor.execute(
+            'SELECT COALESCE(MAX(version), 0) + 1 FROM project_artifacts WHERE project_id = ?',
+            (project_id,)).fetchone()[0]
+
+        lines_of_code = 0
+        for file_name, code in files.items():
+            blob = self.put_blob(cursor, code)
+            lines_of_code += blob["lines"]
+            cursor.execute('''
+                INSERT INTO project_artifacts (project_id, version, file_name, blob_hash, result_id)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (project_id, version, file_name, blob["hash"], result_id))
+
+        # счетчики проекта берутся из последней версии, а не задаются вручную
+        cursor.execute('''
+            UPDATE projects
+            SET lines_of_code = ?, files_count = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (lines_of_code, len(files), project_id))
+
+        with self._lock:
+            self._stats["versions"] += 1
+        return {"version": version, "lines_of_code": lines_of_code, "files_count": len(files)}
+
+    def add_version(self, project_id: int, user_id, files: dict, result_id: str = None) -> Optional[dict]:
+        with self.db.transaction(immediate=True) as cursor:
+            owner = cursor.execute('SELECT 1 FROM projects WHERE id = ? AND user_id = ?',
+                                   (project_id, user_id)).fetchone()
+            if not owner:
+                return None
+            return self.store_version(cursor, project_id, files, result_id)
+
+    def list_versions(self, project_id: int, user_id) -> List[dict]:
+        rows = self.db.fetchall('''
+            SELECT pa.version, pa.file_name, pa.blob_hash, pa.result_id, pa.created_at,
+                   cb.size, cb.stored_size, cb.lines
+            FROM project_artifacts pa
+            JOIN projects p ON p.id = pa.project_id
+            JOIN code_blobs cb ON cb.hash = pa.blob_hash
+            WHERE pa.project_id = ? AND p.user_id = ?
+            ORDER BY pa.version DESC, pa.file_name
+        ''', (project_id, user_id))
+
+        versions = {}
+        for row in rows:
+            version = versions.setdefault(row["version"], {
+                "version": row["version"],
+                "created_at": row["created_at"],
+                "result_id": row["result_id"],
+                "files": []
+            })
+            version["files"].append({
+                "file_name": row["file_name"],
+                "hash": row["blob_hash"],
+                "size": row["size"],
+                "stored_size": row["stored_size"],
+                "lines": row["lines"]
+            })
+        return list(versions.values())
+
+    def get_file_hash(self, project_id: int, user_id, version: int, file_name: str) -> Optional[str]:
+        row = self.db.fetchone('''
+            SELECT pa.blob_hash
+            FROM project_artifacts pa
+            JOIN projects p ON p.id = pa.project_id
+            WHERE pa.project_id = ? AND p.user_id = ? AND pa.version = ? AND pa.file_name = ?
+        ''', (project_id, user_id, version, file_name))
+        return row["blob_hash"] if row else None
+
+    def get_file(self, project_id: int, user_id, version: int, file_name: str) -> Optional[str]:
+        row = self.db.fetchone('''
+            SELECT cb.codec, cb.body
+            FROM project_artifacts pa
+            JOIN projects p ON p.id = pa.project_id
+            JOIN code_blobs cb ON cb.hash = pa.blob_hash
+            WHERE pa.project_id = ? AND p.user_id = ? AND pa.version = ? AND pa.file_name = ?
+        ''', (project_id, user_id, version, file_name))
+        if not row:
+            return None
+        body = zlib.decompress(row["body"]) if row["codec"] == "zlib" else row["body"]
+        return bytes(body).decode("utf-8")
+
+    def get_stats(self) -> dict:
+        row = self.db.fetchone('''
+            SELECT COUNT(*) AS blobs, COALESCE(SUM(size), 0) AS raw_bytes,
+                   COALESCE(SUM(stored_size), 0) AS stored_bytes
+            FROM code_blobs
+        ''')
+        links = self.db.fetchone('''
+            SELECT COUNT(*) AS links, COALESCE(SUM(cb.size), 0) AS logical_bytes
+            FROM project_artifacts pa
+            JOIN code_blobs cb ON cb.hash = pa.blob_hash
+        ''')
+        with self._lock:
+            stats = dict(self._stats)
+
+        stats.update({
+            "blobs": row["blobs"],
+            "links": links["links"],
+            "raw_bytes": row["raw_bytes"],
+            "stored_bytes": row["stored_bytes"],
+            "logical_bytes": links["logical_bytes"],
+            "compression_ratio": round(row["raw_bytes"] / row["stored_bytes"], 2) if row["stored_bytes"] else 0.0,
+            "dedup_ratio": round(links["logical_bytes"] / row["raw_bytes"], 2) if row["raw_bytes"] else 0.0
+        })
+        return stats
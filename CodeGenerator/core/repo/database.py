@@ -0,0 +1,145 @@
+import sqlite3
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+
+
+class TimedConnection:
+    def __init__(self, conn: sqlite3.Connection, database):
+        self.conn = conn
+        self.database = database
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        started = time.perf_counter()
+        try:
+            return self.conn.execute(sql, params)
+        finally:
+            self.database.record_query(sql, time.perf_counter() - started)
+
+    def executemany(self, sql: str, seq_of_params) -> sqlite3.Cursor:
+        started = time.perf_counter()
+        try:
+            return self.conn.executemany(sql, seq_of_params)
+        finally:
+            self.database.record_query(sql, time.perf_counter() - started)
+
+
+class SQLiteDatabase:
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_path: str,
+                 busy_timeout_ms: int = Config.SQLITE_BUSY_TIMEOUT_MS,
+                 synchronous: str = Config.SQLITE_SYNCHRONOUS,
+                 cached_statements: int = Config.SQLITE_STATEMENT_CACHE):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        self.cached_statements = cached_statements
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._connections = 0
+        self._queries = {}
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def for_path(cls, db_path: str) -> "SQLiteDatabase":
+        # один менеджер на файл: репозитории одной базы делят соединения и статистику
+        key = os.path.abspath(db_path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(db_path)
+            return cls._instances[key]
+
+    def connection(self) -> TimedConnection:
+        # соединение живет в потоке и переиспользуется вместе с кэшем подготовленных
+        # выражений; после fork унаследованное соединение не трогаем и открываем новое
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            self._local.conn = TimedConnection(self._connect(), self)
+            self._local.pid = pid
+        return self._local.conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        with self._stats_lock:
+            self._connections += 1
+        return conn
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        return self.connection().execute(sql, params)
+
+    def fetchone(self, sql: str, params=()):
+        return self.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params=()) -> list:
+        return self.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            if conn.conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    def record_query(self, sql: str, elapsed: float):
+        key = " ".join(sql.split())[:120]
+        with self._stats_lock:
+            stats = self._queries.get(key)
+            if stats is None:
+                stats = self._queries[key] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            elapsed_ms = elapsed * 1000
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            queries = [
+                {
+                    "sql": sql,
+                    "count": stats["count"],
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+                    "max_ms": round(stats["max_ms"], 3),
+                    "total_ms": round(stats["total_ms"], 3)
+                }
+                for sql, stats in self._queries.items()
+            ]
+            connections = self._connections
+
+        queries.sort(key=lambda item: item["total_ms"], reverse=True)
+        return {
+            "db_path": self.db_path,
+            "connections_opened": connections,
+            "synchronous": self.synchronous,
+            "busy_timeout_ms": self.busy_timeout_ms,
+            "queries": queries
+        }
+
+    @classmethod
+    def get_all_stats(cls) -> list:
+        with cls._instances_lock:
+            databases = list(cls._instances.values())
+        return [database.get_stats() for database in databases]
@@ -0,0 +1,155 @@
+import json
+import time
+import uuid
+from typing import List, Optional
+
+from config import Config
+from .database import SQLiteDatabase
+
+class JobsRepository:
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, db_path: str = "data/jobs_data.db"):
+        self.db_path = db_path
+        self.db = SQLiteDatabase.for_path(db_path)
+        self.init_database()
+
+    def init_database(self):
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    user_id TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    locked_until REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, kind, created_at)')
+
+            # промежуточные события задачи (разбор требования, фрагменты кода): их читает
+            # потоковый ответ, даже если задачу выполняет воркер другого процесса
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS job_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id, id)')
+
+    def create_job(self, kind: str, user_id: str, payload: dict) -> str:
+        job_id = str(uuid.uuid4())
+        self.db.execute('''
+            INSERT INTO jobs (id, kind, user_id, payload)
+            VALUES (?, ?, ?, ?)
+        ''', (job_id, kind, user_id, json.dumps(payload, ensure_ascii=False)))
+        return job_id
+
+    def claim_next_job(self, kinds: List[str], lease_seconds: int) -> Optional[dict]:
+        # задача берется и помечается running в одной транзакции, поэтому ее не
+        # заберут два воркера; задача с истекшей арендой (воркер умер) берется повторно
+        now = time.time()
+        placeholders = ', '.join('?' for _ in kinds)
+
+        with self.db.transaction(immediate=True) as conn:
+            row = conn.execute(f'''
+                SELECT id, kind, user_id, payload, attempts FROM jobs
+                WHERE kind IN ({placeholders})
+                AND (status = 'queued' OR (status = 'running' AND locked_until < ?))
+                ORDER BY created_at, rowid
+                LIMIT 1
+            ''', (*kinds, now)).fetchone()
+
+            if not row:
+                return None
+
+            job_id, kind, user_id, payload, attempts = row
+            if attempts >= self.MAX_ATTEMPTS:
+                conn.execute('''
+                    UPDATE jobs SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', ("Превышено число попыток выполнения", job_id))
+                return None
+
+            conn.execute('''
+                UPDATE jobs
+                SET status = 'running', attempts = attempts + 1, locked_until = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (now + lease_seconds, job_id))
+            # повторный запуск после истекшей аренды начинает поток событий заново
+            conn.execute('DELETE FROM job_events WHERE job_id = ?', (job_id,))
+
+        return {
+            "id": job_id,
+            "kind": kind,
+            "user_id": user_id,
+            "payload": json.loads(payload)
+        }
+
+    def complete_job(self, job_id: str, result: dict):
+        with self.db.transaction(immediate=True) as conn:
+            conn.execute('''
+                UPDATE jobs
+                SET status = 'done', result = ?, error = NULL, locked_until = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (json.dumps(result, ensure_ascii=False), job_id))
+            self.purge_events(conn)
+
+    def fail_job(self, job_id: str, error: str):
+        with self.db.transaction(immediate=True) as conn:
+            conn.execute('''
+                UPDATE jobs
+                SET status = 'failed', error = ?, locked_until = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (error, job_id))
+            self.purge_events(conn)
+
+    def purge_events(self, conn):
+        # события завершенной задачи нужны, пока за ней может следить потоковый ответ
+        conn.execute('''
+            DELETE FROM job_events WHERE job_id IN (
+                SELECT DISTINCT e.job_id FROM job_events e
+                JOIN jobs j ON j.id = e.job_id
+                WHERE j.status IN ('done', 'failed') AND j.updated_at < datetime('now', ?)
+            )
+        ''', (f"-{Config.JOB_WATCH_TIMEOUT} seconds",))
+
+    def append_events(self, job_id: str, events: list):
+        with self.db.transaction(immediate=True) as conn:
+            conn.executemany('''
+                INSERT INTO job_events (job_id, event, payload)
+                VALUES (?, ?, ?)
+            ''', [(job_id, event, json.dumps(payload, ensure_ascii=False)) for event, payload in events])
+
+    def get_events(self, job_id: str, after_id: int = 0) -> List[tuple]:
+        rows = self.db.fetchall('''
+            SELECT id, event, payload FROM job_events
+            WHERE job_id = ? AND id > ?
+            ORDER BY id
+        ''', (job_id, after_id))
+        return [(row['id'], row['event'], json.loads(row['payload'])) for row in rows]
+
+    def get_job(self, job_id: str, user_id: str) -> Optional[dict]:
+        row = self.db.fetchone('''
+            SELECT id, kind, status, result, error, created_at, updated_at
+            FROM jobs
+            WHERE id = ? AND user_id = ?
+        ''', (job_id, user_id))
+        if not row:
+            return None
+
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
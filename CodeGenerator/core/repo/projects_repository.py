@@ -1,18 +1,25 @@
-import sqlite3
-from datetime import datetime
+import base64
+import json
 from typing import List, Optional
-import os
+import re
+
+from .database import SQLiteDatabase
+from .artifact_repository import ArtifactRepository
 
 class ProjectsRepository:
+    # поля карточки проекта в списке: без user_id и created_at, которые списку не нужны
+    LIST_COLUMNS = ('id, name, description, language, framework, status, '
+                    'lines_of_code, files_count, updated_at')
+
     def __init__(self, db_path: str = "data/app_data.db"):
         self.db_path = db_path
+        self.db = SQLiteDatabase.for_path(db_path)
         self.init_database()
+        # код проектов лежит в той же базе, чтобы версия и счетчики проекта менялись одной транзакцией
+        self.artifacts = ArtifactRepository(db_path)
     
     def init_database(self):
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
+        with self.db.transaction() as cursor:
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS projects (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -30,47 +37,320 @@ class ProjectsRepository:
                 )
             ''')
             
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_id ON projects(user_id)')   
-            conn.commit()
+            # листинг идет по (user_id, updated_at, id) без временного B-дерева для сортировки,
+            # а фильтры по статусу, языку и фреймворку проверяются по индексу. Индекс не покрывающий:
+            # название, описание и счетчики читаются из таблицы, но только для строк страницы
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_projects_user_updated
+                ON projects(user_id, updated_at, id, status, language, framework)
+            ''')
+            cursor.execute('DROP INDEX IF EXISTS idx_user_id')
+            self.init_counters(cursor)
+            self.init_search(cursor)
+
+    def init_counters(self, cursor):
+        # счетчики поддерживают триггеры, поэтому статистика читается одной строкой
+        # по первичному ключу вместо агрегатов по всей таблице projects
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS project_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_project_stats (
+                user_id TEXT PRIMARY KEY,
+                total_projects INTEGER NOT NULL DEFAULT 0,
+                completed_projects INTEGER NOT NULL DEFAULT 0,
+                draft_projects INTEGER NOT NULL DEFAULT 0,
+                total_lines INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_projects_counters_insert
+            AFTER INSERT ON projects
+            BEGIN
+                UPDATE project_counters SET value = value + 1 WHERE name = 'total_projects';
+                INSERT INTO user_project_stats (user_id, total_projects, completed_projects, draft_projects, total_lines)
+                VALUES (NEW.user_id, 1, NEW.status = 'completed', NEW.status = 'draft', COALESCE(NEW.lines_of_code, 0))
+                ON CONFLICT(user_id) DO UPDATE SET
+                    total_projects = total_projects + 1,
+                    completed_projects = completed_projects + excluded.completed_projects,
+                    draft_projects = draft_projects + excluded.draft_projects,
+                    total_lines = total_lines + excluded.total_lines;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_projects_counters_delete
+            AFTER DELETE ON projects
+            BEGIN
+                UPDATE project_counters SET value = value - 1 WHERE name = 'total_projects';
+                UPDATE user_project_stats SET
+                    total_projects = total_projects - 1,
+                    completed_projects = completed_projects - (OLD.status = 'completed'),
+                    draft_projects = draft_projects - (OLD.status = 'draft'),
+                    total_lines = total_lines - COALESCE(OLD.lines_of_code, 0)
+                WHERE user_id = OLD.user_id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_projects_counters_update
+            AFTER UPDATE OF user_id, status, lines_of_code ON projects
+            BEGIN
+                UPDATE user_project_stats SET
+                    total_projects = total_projects - 1,
+                    completed_projects = completed_projects - (OLD.status = 'completed'),
+                    draft_projects = draft_projects - (OLD.status = 'draft'),
+                    total_lines = total_lines - COALESCE(OLD.lines_of_code, 0)
+                WHERE user_id = OLD.user_id;
+                INSERT INTO user_project_stats (user_id, total_projects, completed_projects, draft_projects, total_lines)
+                VALUES (NEW.user_id, 1, NEW.status = 'completed', NEW.status = 'draft', COALESCE(NEW.lines_of_code, 0))
+                ON CONFLICT(user_id) DO UPDATE SET
+                    total_projects = total_projects + 1,
+                    completed_projects = completed_projects + excluded.completed_projects,
+                    draft_projects = draft_projects + excluded.draft_projects,
+                    total_lines = total_lines + excluded.total_lines;
+            END
+        ''')
+
+        # при первом запуске на существующей базе счетчики заполняются по текущим данным
+        cursor.execute('''
+            INSERT OR IGNORE INTO project_counters (name, value)
+            SELECT 'total_projects', COUNT(*) FROM projects
+        ''')
+        if cursor.execute('SELECT changes()').fetchone()[0]:
+            cursor.execute('DELETE FROM user_project_stats')
+            cursor.execute('''
+                INSERT INTO user_project_stats (user_id, total_projects, completed_projects, draft_projects, total_lines)
+                SELECT user_id, COUNT(*), SUM(status = 'completed'), SUM(status = 'draft'),
+                       COALESCE(SUM(lines_of_code), 0)
+                FROM projects
+                GROUP BY user_id
+            ''')
     
     def create_project(self, user_id: int, name: str, description: str, 
-                       language: str, framework: str, status: str = "draft") -> int:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+                       language: str, framework: str, status: str = "draft",
+                       files: dict = None, result_id: str = None) -> int:
+        with self.db.transaction(immediate=bool(files)) as cursor:
+            project_id = cursor.execute('''
                 INSERT INTO projects (user_id, name, description, language, framework, status)
                 VALUES (?, ?, ?, ?, ?, ?)
-            ''', (user_id, name, description, language, framework, status))
-            
-            conn.commit()
-            return cursor.lastrowid
+            ''', (user_id, name, description, language, framework, status)).lastrowid
+            if files:
+                self.artifacts.store_version(cursor, project_id, files, result_id)
+        return project_id
     
+    def iter_user_projects(self, user_id: int, fetch_size: int = 500):
+        # курсор читается порциями, поэтому экспорт не собирает весь список в памяти
+        cursor = self.db.execute('''
+            SELECT id, name, description, language, framework, status,
+                   lines_of_code, files_count, created_at, updated_at
+            FROM projects
+            WHERE user_id = ?
+            ORDER BY id
+        ''', (user_id,))
+        try:
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(row)
+        finally:
+            cursor.close()
+
+    def import_projects(self, user_id: int, projects, batch_size: int = 1000, on_batch=None) -> int:
+        return self.create_projects_bulk(((user_id, project) for project in projects), batch_size, on_batch)
+
+    def create_projects_bulk(self, owned_projects, batch_size: int = 1000, on_batch=None) -> int:
+        # on_batch получает размер каждой зафиксированной пачки - по нему вызывающий
+        # знает, сколько строк уже в базе, если следующая пачка упадет
+        sql = '''
+            INSERT INTO projects (user_id, name, description, language, framework, status,
+                                  lines_of_code, files_count, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+        '''
+        imported = 0
+        batch = []
+        for user_id, project in owned_projects:
+            batch.append(((
+                user_id,
+                project['name'],
+                project.get('description', ''),
+                project['language'],
+                project['framework'],
+                project.get('status') or 'draft',
+                project.get('lines_of_code') or 0,
+                project.get('files_count') or 0,
+                project.get('created_at'),
+                project.get('updated_at')
+            ), project.get('files')))
+            if len(batch) >= batch_size:
+                imported += self._insert_batch(sql, batch, on_batch)
+                batch = []
+        if batch:
+            imported += self._insert_batch(sql, batch, on_batch)
+        return imported
+
+    def _insert_batch(self, sql: str, batch: list, on_batch=None) -> int:
+        with self.db.transaction() as cursor:
+            cursor.executemany(sql, [row for row, files in batch if not files])
+            # проектам с кодом нужен id для привязки версии, поэтому они вставляются по одному
+            # в той же транзакции; одинаковые файлы при этом сохраняются один раз
+            for row, files in batch:
+                if files:
+                    project_id = cursor.execute(sql, row).lastrowid
+                    self.artifacts.store_version(cursor, project_id, files)
+        if on_batch:
+            on_batch(len(batch))
+        return len(batch)
+
     def get_user_projects(self, user_id: int) -> List[dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM projects 
-                WHERE user_id = ? 
-                ORDER BY updated_at DESC
-            ''', (user_id,))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+        rows = self.db.fetchall('''
+            SELECT * FROM projects 
+            WHERE user_id = ? 
+            ORDER BY updated_at DESC
+        ''', (user_id,))
+        return [dict(row) for row in rows]
+    
+    def init_search(self, cursor):
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'projects_fts'").fetchone()
+
+        # индекс без собственной копии текста (content=''): хранятся только списки вхождений,
+        # а проект пользователя отбирается токеном user_key внутри того же MATCH
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+                name, description, user_key,
+                content='',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+
+        user_key = "'u' || replace({row}.user_id, '-', '')"
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_projects_fts_insert
+            AFTER INSERT ON projects
+            BEGIN
+                INSERT INTO projects_fts (rowid, name, description, user_key)
+                VALUES (NEW.id, NEW.name, NEW.description, {user_key.format(row='NEW')});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_projects_fts_delete
+            AFTER DELETE ON projects
+            BEGIN
+                INSERT INTO projects_fts (projects_fts, rowid, name, description, user_key)
+                VALUES ('delete', OLD.id, OLD.name, OLD.description, {user_key.format(row='OLD')});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_projects_fts_update
+            AFTER UPDATE OF name, description, user_id ON projects
+            BEGIN
+                INSERT INTO projects_fts (projects_fts, rowid, name, description, user_key)
+                VALUES ('delete', OLD.id, OLD.name, OLD.description, {user_key.format(row='OLD')});
+                INSERT INTO projects_fts (rowid, name, description, user_key)
+                VALUES (NEW.id, NEW.name, NEW.description, {user_key.format(row='NEW')});
+            END
+        ''')
+
+        if not exists:
+            self._fill_search_index(cursor)
+
+    def _fill_search_index(self, cursor) -> int:
+        cursor.execute("INSERT INTO projects_fts (projects_fts) VALUES ('delete-all')")
+        cursor.execute('''
+            INSERT INTO projects_fts (rowid, name, description, user_key)
+            SELECT id, name, description, 'u' || replace(user_id, '-', '') FROM projects
+        ''')
+        return cursor.execute('SELECT changes()').fetchone()[0]
+
+    def rebuild_search_index(self) -> int:
+        with self.db.transaction(immediate=True) as cursor:
+            count = self._fill_search_index(cursor)
+            cursor.execute("INSERT INTO projects_fts (projects_fts) VALUES ('optimize')")
+        return count
+
+    @staticmethod
+    def build_match_query(user_id, query: str) -> Optional[str]:
+        # пользовательский ввод не попадает в синтаксис FTS5 напрямую: берутся только слова,
+        # каждое в кавычках и с поиском по префиксу
+        terms = re.findall(r'\w+', query)[:8]
+        if not terms:
+            return None
+        user_key = 'u' + str(user_id).replace('-', '')
+        words = ' '.join(f'"{term}"*' for term in terms)
+        return f'user_key : "{user_key}" AND {{name description}} : ({words})'
+
+    def search_user_projects(self, user_id: int, query: str, limit: int = 20, offset: int = 0) -> dict:
+        match = self.build_match_query(user_id, query)
+        if not match:
+            return {"projects": [], "next_offset": None}
+
+        rows = self.db.fetchall('''
+            SELECT p.*, bm25(projects_fts, 10.0, 1.0, 0.0) AS score
+            FROM projects_fts
+            JOIN projects p ON p.id = projects_fts.rowid
+            WHERE projects_fts MATCH ? AND p.user_id = ?
+            ORDER BY score, p.id
+            LIMIT ? OFFSET ?
+        ''', (match, user_id, limit + 1, offset))
+
+        projects = [dict(row) for row in rows[:limit]]
+        next_offset = offset + limit if len(rows) > limit else None
+        return {"projects": projects, "next_offset": next_offset}
+
+    @staticmethod
+    def encode_cursor(project: dict) -> str:
+        raw = json.dumps([project['updated_at'], project['id']])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        try:
+            updated_at, project_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return str(updated_at), int(project_id)
+        except (ValueError, TypeError):
+            raise ValueError("Некорректный курсор")
+
+    def get_user_projects_page(self, user_id: int, limit: int = 20, cursor: Optional[str] = None,
+                               status: Optional[str] = None, language: Optional[str] = None,
+                               framework: Optional[str] = None) -> dict:
+        conditions = ['user_id = ?']
+        params = [user_id]
+
+        for field, value in (('status', status), ('language', language), ('framework', framework)):
+            if value:
+                conditions.append(f'{field} = ?')
+                params.append(value)
+
+        if cursor:
+            updated_at, project_id = self.decode_cursor(cursor)
+            conditions.append('(updated_at < ? OR (updated_at = ? AND id < ?))')
+            params.extend([updated_at, updated_at, project_id])
+
+        # берем на одну строку больше, чтобы понять, есть ли следующая страница
+        params.append(limit + 1)
+        rows = self.db.fetchall(f'''
+            SELECT {self.LIST_COLUMNS} FROM projects
+            WHERE {' AND '.join(conditions)}
+            ORDER BY updated_at DESC, id DESC
+            LIMIT ?
+        ''', params)
+
+        projects = [dict(row) for row in rows[:limit]]
+        next_cursor = self.encode_cursor(projects[-1]) if len(rows) > limit else None
+        return {"projects": projects, "next_cursor": next_cursor}
     
     def get_project_by_id(self, project_id: int, user_id: int) -> Optional[dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM projects 
-                WHERE id = ? AND user_id = ?
-            ''', (project_id, user_id))
-            
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        row = self.db.fetchone('''
+            SELECT * FROM projects 
+            WHERE id = ? AND user_id = ?
+        ''', (project_id, user_id))
+        return dict(row) if row else None
     
     def update_project(self, project_id: int, user_id: int, **kwargs) -> bool:
         if not kwargs:
@@ -92,57 +372,33 @@ class ProjectsRepository:
             WHERE id = ? AND user_id = ?
         '''
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(sql, tuple(values))
-            conn.commit()
-            
-            return cursor.rowcount > 0
+        cursor = self.db.execute(sql, tuple(values))
+        return cursor.rowcount > 0
     
     def delete_project(self, project_id: int, user_id: int) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                DELETE FROM projects 
-                WHERE id = ? AND user_id = ?
-            ''', (project_id, user_id))
-            
-            conn.commit()
-            return cursor.rowcount > 0
+        cursor = self.db.execute('''
+            DELETE FROM projects 
+            WHERE id = ? AND user_id = ?
+        ''', (project_id, user_id))
+        return cursor.rowcount > 0
     
     def get_user_stats(self, user_id: int) -> dict:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT COUNT(*) FROM projects WHERE user_id = ?', (user_id,))
-            total_projects = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM projects WHERE user_id = ? AND status = ?', 
-                         (user_id, 'completed'))
-            completed_projects = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM projects WHERE user_id = ? AND status = ?', 
-                         (user_id, 'draft'))
-            draft_projects = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT SUM(lines_of_code) FROM projects WHERE user_id = ?', (user_id,))
-            total_lines = cursor.fetchone()[0] or 0
-            
-            return {
-                'total_projects': total_projects,
-                'completed_projects': completed_projects,
-                'draft_projects': draft_projects,
-                'total_lines': total_lines
-            }
+        row = self.db.fetchone('''
+            SELECT total_projects, completed_projects, draft_projects, total_lines
+            FROM user_project_stats
+            WHERE user_id = ?
+        ''', (user_id,))
+        
+        return {
+            'total_projects': row[0] if row else 0,
+            'completed_projects': row[1] if row else 0,
+            'draft_projects': row[2] if row else 0,
+            'total_lines': row[3] if row else 0
+        }
         
     def get_user_project_count(self, user_id: int) -> int:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT COUNT(*) FROM projects 
-                WHERE user_id = ?
-            ''', (user_id,))
-            
-            result = cursor.fetchone()
-            return result[0] if result else 0
+        return self.get_user_stats(user_id)['total_projects']
+
+    def get_total_projects_count(self) -> int:
+        result = self.db.fetchone("SELECT value FROM project_counters WHERE name = 'total_projects'")
+        return result[0] if result else 0
@@ -1,46 +1,83 @@
 import sqlite3
 import hashlib
 from typing import Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 import uuid
 
+from config import Config
+from .database import SQLiteDatabase
+from .write_buffer import LoginWriteBuffer
+
 class UserRepository:
     def __init__(self, db_path: str = "data/users_data.db"):
         self.db_path = db_path
+        self.db = SQLiteDatabase.for_path(db_path)
+        # отметки last_login копятся в буфере и уходят одной транзакцией
+        self.write_buffer = LoginWriteBuffer(self) if Config.LOGIN_WRITE_BEHIND else None
         self.init_database()
     
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id TEXT PRIMARY KEY,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                email TEXT,
-                full_name TEXT,
-                role TEXT DEFAULT 'DEVELOPER',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP,
-                is_active INTEGER DEFAULT 1
-            )
-        ''')
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id TEXT PRIMARY KEY,
+                    username TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    email TEXT,
+                    full_name TEXT,
+                    role TEXT DEFAULT 'DEVELOPER',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_login TIMESTAMP,
+                    is_active INTEGER DEFAULT 1
+                )
+            ''')
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_sessions (
-                session_id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expire_time TIMESTAMP,
-                ip_address TEXT,
-                user_agent TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expire_time TIMESTAMP,
+                    ip_address TEXT,
+                    user_agent TEXT,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            # срок жизни хранится в строке: проверка сессии - поиск по ключу,
+            # а очистка истекших идет по индексу expire_time
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_sessions_expire ON user_sessions (expire_time)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_sessions_user ON user_sessions (user_id)')
+            cursor.execute('''
+                UPDATE user_sessions
+                SET expire_time = datetime(login_time, '+8 hours')
+                WHERE expire_time IS NULL
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_users_counters_insert
+                AFTER INSERT ON users
+                BEGIN
+                    UPDATE user_counters SET value = value + 1 WHERE name = 'total_users';
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_users_counters_delete
+                AFTER DELETE ON users
+                BEGIN
+                    UPDATE user_counters SET value = value - 1 WHERE name = 'total_users';
+                END
+            ''')
+            cursor.execute('''
+                INSERT OR IGNORE INTO user_counters (name, value)
+                SELECT 'total_users', COUNT(*) FROM users
+            ''')
         
-        conn.commit()
-        conn.close()
         self.create_default_users()
     
     def create_default_users(self):
@@ -68,16 +105,7 @@ class UserRepository:
             }
         ]
         
-        for user_data in default_users:
-            existing = self.get_user_by_username(user_data["username"])
-            if not existing:
-                self.create_user(
-                    username=user_data["username"],
-                    password=user_data["password"],
-                    email=user_data["email"],
-                    full_name=user_data["full_name"],
-                    role=user_data["role"]
-                )
+        self.create_users(default_users)
     
     def hash_password(self, password: str) -> str:
         return hashlib.sha256(password.encode()).hexdigest()
@@ -87,19 +115,13 @@ class UserRepository:
     
     def create_user(self, username: str, password: str, email: str = None, full_name: str = None, role: str = "DEVELOPER") -> bool:
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             user_id = str(uuid.uuid4())
             password_hash = self.hash_password(password)
             
-            cursor.execute('''
+            self.db.execute('''
                 INSERT INTO users (id, username, password_hash, email, full_name, role)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (user_id, username, password_hash, email, full_name, role))
-            
-            conn.commit()
-            conn.close()
             return True
         except sqlite3.IntegrityError:
             return False  
@@ -107,19 +129,46 @@ class UserRepository:
             print(f"Ошибка создания пользователя: {e}")
             return False
     
+    def create_users(self, users: list) -> list:
+        # проверка существующих имен и вставка идут одной транзакцией на всю пачку
+        rows = []
+        seen = set()
+        for user in users:
+            if user["username"] in seen:
+                continue
+            seen.add(user["username"])
+            rows.append((
+                str(uuid.uuid4()),
+                user["username"],
+                self.hash_password(user["password"]),
+                user.get("email"),
+                user.get("full_name"),
+                user.get("role") or "DEVELOPER"
+            ))
+        if not rows:
+            return []
+
+        placeholders = ', '.join('?' for _ in rows)
+        with self.db.transaction(immediate=True) as cursor:
+            existing = {row[0] for row in cursor.execute(
+                f'SELECT username FROM users WHERE username IN ({placeholders})',
+                [row[1] for row in rows]
+            )}
+            rows = [row for row in rows if row[1] not in existing]
+            cursor.executemany('''
+                INSERT INTO users (id, username, password_hash, email, full_name, role)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+        return [{"id": row[0], "username": row[1], "role": row[5]} for row in rows]
+    
     def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        user_data = self.db.fetchone('''
             SELECT id, username, password_hash, email, full_name, role
             FROM users 
             WHERE username = ? AND is_active = 1
         ''', (username,))
         
-        user_data = cursor.fetchone()
-        conn.close()
-        
         if user_data:
             user_id, username, password_hash, email, full_name, role = user_data
             if self.verify_password(password, password_hash):
@@ -135,18 +184,12 @@ class UserRepository:
     
 
     def get_all_users(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        users = self.db.fetchall('''
             SELECT id, username, email, full_name, role, created_at, is_active
             FROM users
             ORDER BY created_at DESC
         ''')
         
-        users = cursor.fetchall()
-        conn.close()
-        
         return [
             {
                 "id": user[0],
@@ -160,19 +203,17 @@ class UserRepository:
             for user in users
         ]
     
+    def get_total_users_count(self) -> int:
+        result = self.db.fetchone("SELECT value FROM user_counters WHERE name = 'total_users'")
+        return result[0] if result else 0
+    
     def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        user_data = self.db.fetchone('''
             SELECT id, username, email, full_name, role, created_at
             FROM users 
             WHERE username = ? AND is_active = 1
         ''', (username,))
         
-        user_data = cursor.fetchone()
-        conn.close()
-        
         if user_data:
             return {
                 "id": user_data[0],
@@ -186,75 +227,99 @@ class UserRepository:
         return None
     
     def update_last_login(self, user_id: str):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        if self.write_buffer:
+            self.write_buffer.touch_last_login(user_id, self.utc_timestamp())
+            return
+        self.db.execute('''
             UPDATE users 
             SET last_login = CURRENT_TIMESTAMP
             WHERE id = ?
         ''', (user_id,))
-        
-        conn.commit()
-        conn.close()
     
-    def create_session(self, user_id: str, ip_address: str = None, user_agent: str = None, duration_hours: int = 8) -> str:
+    def create_session(self, user_id: str, ip_address: str = None, user_agent: str = None,
+                       duration_hours: int = Config.SESSION_DURATION_HOURS) -> str:
+        # сессия пишется сразу: ее проверяют другие воркеры, и она не должна пропасть вместе с процессом
         session_id = str(uuid.uuid4())
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO user_sessions (session_id, user_id, ip_address, user_agent)
-            VALUES (?, ?, ?, ?)
-        ''', (session_id, user_id, ip_address, user_agent))
-        
-        conn.commit()
-        conn.close()
+        self.db.execute('''
+            INSERT INTO user_sessions (session_id, user_id, expire_time, ip_address, user_agent)
+            VALUES (?, ?, datetime(CURRENT_TIMESTAMP, ?), ?, ?)
+        ''', (session_id, user_id, f'+{int(duration_hours)} hours', ip_address, user_agent))
         return session_id
     
+    def utc_timestamp(self, moment: datetime = None) -> str:
+        # тот же формат, что у CURRENT_TIMESTAMP, чтобы сравнения в SQL оставались строковыми
+        return (moment or datetime.now(timezone.utc)).strftime('%Y-%m-%d %H:%M:%S')
+    
+    def write_login_batch(self, last_logins: list):
+        with self.db.transaction(immediate=True) as cursor:
+            cursor.executemany('UPDATE users SET last_login = ? WHERE id = ?', last_logins)
+    
     def validate_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT us.session_id, us.user_id, us.login_time, 
+        session_data = self.db.fetchone('''
+            SELECT us.session_id, us.user_id, us.login_time, us.expire_time,
                    u.username, u.email, u.full_name, u.role
             FROM user_sessions us
             JOIN users u ON us.user_id = u.id
             WHERE us.session_id = ? 
+            AND us.expire_time > CURRENT_TIMESTAMP
             AND u.is_active = 1
-            AND datetime(us.login_time, '+8 hours') > CURRENT_TIMESTAMP
         ''', (session_id,))
         
-        session_data = cursor.fetchone()
-        conn.close()
-        
         if session_data:
             return {
                 "session_id": session_data[0],
                 "user_id": session_data[1],
                 "login_time": session_data[2],
-                "username": session_data[3],
-                "email": session_data[4],
-                "full_name": session_data[5],
-                "role": session_data[6]
+                "expire_time": session_data[3],
+                "username": session_data[4],
+                "email": session_data[5],
+                "full_name": session_data[6],
+                "role": session_data[7]
             }
         
         return None
     
+    def purge_expired_sessions(self, batch_size: int = Config.SESSION_SWEEP_BATCH, max_batches: int = 1000) -> int:
+        # удаляем небольшими пачками: каждая - отдельная короткая транзакция,
+        # чтобы очистка не держала блокировку записи перед логинами
+        deleted = 0
+        for _ in range(max_batches):
+            removed = self.db.execute('''
+                DELETE FROM user_sessions
+                WHERE session_id IN (
+                    SELECT session_id FROM user_sessions
+                    WHERE expire_time <= CURRENT_TIMESTAMP
+                    LIMIT ?
+                )
+            ''', (batch_size,)).rowcount
+            deleted += removed
+            if removed < batch_size:
+                break
+        return deleted
+    
+    def get_sessions_count(self) -> int:
+        return self.db.fetchone('SELECT COUNT(*) FROM user_sessions')[0]
+    
+    def get_session_username(self, session_id: str) -> Optional[str]:
+        row = self.db.fetchone('''
+            SELECT u.username
+            FROM user_sessions us
+            JOIN users u ON us.user_id = u.id
+            WHERE us.session_id = ?
+        ''', (session_id,))
+        return row[0] if row else None
+    
+    def delete_user(self, user_id: str) -> bool:
+        with self.db.transaction() as cursor:
+            cursor.execute('DELETE FROM user_sessions WHERE user_id = ?', (user_id,))
+            deleted = cursor.execute('DELETE FROM users WHERE id = ?', (user_id,)).rowcount
+        return deleted > 0
+    
     def delete_session(self, session_id: str):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM user_sessions WHERE session_id = ?', (session_id,))
-        conn.commit()
-        conn.close()
+        self.db.execute('DELETE FROM user_sessions WHERE session_id = ?', (session_id,))
 
     def update_user(self, username: str, **kwargs) -> bool:
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             allowed_fields = ['email', 'full_name']
             update_fields = []
             update_values = []
@@ -265,7 +330,6 @@ class UserRepository:
                     update_values.append(value)
             
             if not update_fields:
-                conn.close()
                 return False
             
             update_values.append(username)
@@ -276,9 +340,7 @@ class UserRepository:
                 WHERE username = ?
             '''
             
-            cursor.execute(query, update_values)
-            conn.commit()
-            conn.close()
+            cursor = self.db.execute(query, update_values)
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -287,17 +349,11 @@ class UserRepository:
         
     def update_user_role(self, username: str, role: str) -> bool:
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            cursor = self.db.execute('''
                 UPDATE users 
                 SET role = ?
                 WHERE username = ?
             ''', (role, username))
-            
-            conn.commit()
-            conn.close()
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -0,0 +1,149 @@
+import atexit
+import os
+import threading
+import time
+
+from config import Config
+
+
+class LoginWriteBuffer:
+    def __init__(self, repository,
+                 flush_interval_ms: int = Config.LOGIN_FLUSH_INTERVAL_MS,
+                 flush_batch: int = Config.LOGIN_FLUSH_BATCH,
+                 max_pending: int = Config.LOGIN_QUEUE_MAX,
+                 max_retries: int = Config.LOGIN_FLUSH_MAX_RETRIES):
+        self.repository = repository
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_batch = flush_batch
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+
+        # last_login схлопывается по пользователю: в базу уходит только последнее время входа
+        self._last_logins = {}
+        self._failed_attempts = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            "touches": 0, "touches_coalesced": 0,
+            "flushes": 0, "forced_flushes": 0, "rows_written": 0, "max_batch": 0,
+            "flush_ms_total": 0.0, "errors": 0, "rows_dropped": 0, "last_error": None
+        }
+
+    def touch_last_login(self, user_id: str, login_time: str):
+        with self._lock:
+            if user_id in self._last_logins:
+                self._stats["touches_coalesced"] += 1
+            self._last_logins[user_id] = login_time
+            self._stats["touches"] += 1
+        self._after_enqueue()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._last_logins)
+
+    def _after_enqueue(self):
+        self._ensure_thread()
+        pending = self.pending()
+        if pending >= self.max_pending:
+            # очередь ограничена: при переполнении пишущий поток сам сбрасывает буфер
+            with self._lock:
+                self._stats["forced_flushes"] += 1
+            self.flush()
+        elif pending >= self.flush_batch:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        # буфер создается еще в мастере gunicorn, поток поднимается в том процессе, который пишет
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._flush_lock:
+            if self._pid == pid:
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._loop, name="login-write-buffer", daemon=True)
+            self._thread.start()
+            self._pid = pid
+            atexit.register(self.stop)
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                last_logins, self._last_logins = self._last_logins, {}
+            if not last_logins:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self.repository.write_login_batch(
+                    [(login_time, user_id) for user_id, login_time in last_logins.items()])
+            except Exception as e:
+                self._requeue(last_logins, e)
+                return 0
+
+            written = len(last_logins)
+            with self._lock:
+                self._failed_attempts = 0
+                self._stats["flushes"] += 1
+                self._stats["rows_written"] += written
+                self._stats["max_batch"] = max(self._stats["max_batch"], written)
+                self._stats["flush_ms_total"] += (time.perf_counter() - started) * 1000
+            return written
+
+    def _requeue(self, last_logins: dict, error: Exception):
+        with self._lock:
+            self._failed_attempts += 1
+            attempt = self._failed_attempts
+            self._stats["errors"] += 1
+            self._stats["last_error"] = str(error)
+            dropped = 0
+
+            if self._failed_attempts > self.max_retries:
+                # база недоступна дольше нескольких попыток: отметки входа не критичны, пачка отбрасывается
+                dropped = len(last_logins)
+                self._failed_attempts = 0
+            else:
+                # более свежие значения не затираются, а очередь не растет сверх max_pending
+                for user_id, login_time in last_logins.items():
+                    if user_id in self._last_logins:
+                        continue
+                    if len(self._last_logins) >= self.max_pending:
+                        dropped += 1
+                        continue
+                    self._last_logins[user_id] = login_time
+            self._stats["rows_dropped"] += dropped
+
+        if dropped:
+            print(f"[LoginWriteBuffer] Отброшено отметок входа: {dropped} после ошибки: {error}")
+        else:
+            print(f"[LoginWriteBuffer] Ошибка записи пачки, повтор {attempt}/{self.max_retries}: {error}")
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        self.flush()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._last_logins)
+        flushes = stats["flushes"]
+        stats["avg_batch"] = round(stats["rows_written"] / flushes, 2) if flushes else 0.0
+        stats["avg_flush_ms"] = round(stats.pop("flush_ms_total") / flushes, 3) if flushes else 0.0
+        # сколько отметок пришлось на одну транзакцию вместо транзакции на каждый вход
+        stats["writes_per_transaction"] = round(stats["touches"] / flushes, 2) if flushes else 0.0
+        stats["flush_interval_ms"] = round(self.flush_interval * 1000)
+        stats["flush_batch"] = self.flush_batch
+        stats["max_pending"] = self.max_pending
+        stats["max_retries"] = self.max_retries
+        return stats
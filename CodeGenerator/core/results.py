@@ -0,0 +1,138 @@
+import sqlite3
+import json
+import threading
+import time
+import uuid
+from typing import Optional
+
+from config import Config
+from .models import ValidationStatus
+from .repo.database import SQLiteDatabase
+
+
+class GenerationResultStore:
+    PURGE_EVERY = 50
+
+    def __init__(self, db_path: str = Config.RESULT_STORE_DB,
+                 max_size: int = Config.RESULT_STORE_SIZE,
+                 ttl_seconds: int = Config.RESULT_STORE_TTL):
+        self.db_path = db_path
+        self.db = SQLiteDatabase.for_path(db_path)
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"saved": 0, "hits": 0, "misses": 0, "evicted": 0}
+
+        self.init_database()
+
+    def init_database(self):
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS generation_results (
+                    result_id TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    session_id TEXT,
+                    requirement_text TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    code TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    errors TEXT NOT NULL,
+                    optimizations TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_generation_results_user
+                ON generation_results (user_id, created_at)
+            ''')
+
+    def save(self, user_id, session_id, requirement_text: str, generated) -> str:
+        result_id = uuid.uuid4().hex
+        errors = []
+        if generated.validation_status == ValidationStatus.INVALID:
+            errors.append("Код не прошел синтаксическую проверку")
+
+        self.db.execute('''
+            INSERT INTO generation_results
+            (result_id, user_id, session_id, requirement_text, language, code, status,
+             errors, optimizations, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (result_id, user_id, session_id, requirement_text, generated.language,
+              generated.code_body, generated.validation_status.value,
+              json.dumps(errors, ensure_ascii=False), "[]", time.time()))
+
+        with self._lock:
+            self._stats["saved"] += 1
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if purge:
+            self.purge()
+        return result_id
+
+    def get(self, result_id: str, user_id) -> Optional[dict]:
+        row = self.db.fetchone('''
+            SELECT * FROM generation_results
+            WHERE result_id = ? AND user_id = ? AND created_at > ?
+        ''', (result_id, user_id, time.time() - self.ttl_seconds))
+        return self._row_to_result(row)
+
+    def latest(self, user_id, session_id=None) -> Optional[dict]:
+        query = '''
+            SELECT * FROM generation_results
+            WHERE user_id = ? AND created_at > ?
+        '''
+        params = [user_id, time.time() - self.ttl_seconds]
+        if session_id:
+            query += ' AND session_id = ?'
+            params.append(session_id)
+        query += ' ORDER BY created_at DESC LIMIT 1'
+
+        row = self.db.fetchone(query, params)
+        return self._row_to_result(row)
+
+    def record_optimization(self, result_id: str, code: str, status: str):
+        self.db.execute('''
+            UPDATE generation_results
+            SET optimizations = ?, status = ?
+            WHERE result_id = ?
+        ''', (json.dumps([{"code": code, "status": status}], ensure_ascii=False), status, result_id))
+
+    def purge(self):
+        try:
+            with self.db.transaction(immediate=True) as conn:
+                expired = conn.execute('DELETE FROM generation_results WHERE created_at <= ?',
+                                       (time.time() - self.ttl_seconds,)).rowcount
+                overflow = conn.execute('''
+                    DELETE FROM generation_results WHERE result_id IN (
+                        SELECT result_id FROM generation_results
+                        ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_size,)).rowcount
+        except sqlite3.Error as e:
+            print(f"[GenerationResultStore] Ошибка очистки результатов: {e}")
+            return
+
+        with self._lock:
+            self._stats["evicted"] += expired + overflow
+
+    def _row_to_result(self, row) -> Optional[dict]:
+        with self._lock:
+            self._stats["hits" if row else "misses"] += 1
+        if not row:
+            return None
+
+        result = dict(row)
+        result["errors"] = json.loads(result["errors"])
+        result["optimizations"] = json.loads(result["optimizations"])
+        return result
+
+    def get_stats(self) -> dict:
+        size = self.db.fetchone('SELECT COUNT(*) FROM generation_results')[0]
+        with self._lock:
+            stats = dict(self._stats)
+        stats["size"] = size
+        stats["max_size"] = self.max_size
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
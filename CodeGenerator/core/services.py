@@ -1,84 +1,357 @@
-from openai import OpenAI
 import re
 import ast
 import json
 import os
-from typing import Dict
+from typing import Dict, Optional
+from config import Config
 from .models import StructuredModel, GeneratedCode, ValidationStatus
 
-client = OpenAI(base_url="http://localhost:11434/v1", api_key="ollama")
-MODEL = "qwen2.5-coder:7b"
+class JsonObjectScanner:
+    # Следит за скобками вне строк и сообщает, когда закрылся JSON-объект верхнего уровня
+    def __init__(self):
+        self.parts = []
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.result = None
+
+    def feed(self, chunk: str) -> Optional[str]:
+        if self.result is not None:
+            return self.result
+
+        for ch in chunk:
+            if self.depth == 0:
+                if ch == "{":
+                    self.depth = 1
+                    self.parts.append(ch)
+                continue
+
+            self.parts.append(ch)
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.result = "".join(self.parts)
+                    return self.result
+        return None
+
+
+def track_usage(usage: dict, chunk):
+    # в потоке Ollama один чанк примерно равен одному токену
+    choice = chunk.choices[0]
+    if choice.delta.content:
+        usage["completion_tokens"] += 1
+    usage["finish_reason"] = choice.finish_reason or usage["finish_reason"]
+
 
 class IRequirementAnalysysService:
     def analyze(self,requirement): pass
 
 class RequirementAnalysisService(IRequirementAnalysysService):
-    def analyze(self, requirement) -> StructuredModel:
-        prompt = (
-            "Ты эксперт-аналитик. Разбери требование и верни ТОЛЬКО чистый JSON без пояснений:\n"
-            "{\n"
-            '  "functional_description": "...",\n'
-            '  "target_language": "Python",\n'
-            '  "entities": {"ИмяКласса": ["поле1", "поле2"]}\n'
-            "}\n"
-            "Если не уверен — оставь пустые поля."
-        )
-        user_prompt = f"Требование: {requirement.input_text}"
+    TEMPERATURE = 0.3
 
-        try:
-            response = client.chat.completions.create(
-                model=MODEL,
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=512
-            )
-            text = response.choices[0].message.content
-            json_match = re.search(r"\{.*\}", text, re.DOTALL)
-            data = json.loads(json_match.group()) if json_match else {}
-        except Exception as e:
-            print(f"[RequirementAnalysisService] Ошибка: {e}")
-            data = {"functional_description": requirement.input_text, "target_language": "Python", "entities": {}}
+    SYSTEM_PROMPT = (
+        "Ты эксперт-аналитик. Разбери требование и верни ТОЛЬКО чистый JSON без пояснений:\n"
+        "{\n"
+        '  "functional_description": "...",\n'
+        '  "target_language": "Python",\n'
+        '  "entities": {"ИмяКласса": ["поле1", "поле2"]}\n'
+        "}\n"
+        "Если не уверен — оставь пустые поля."
+    )
+
+    def __init__(self, router, budget):
+        self.router = router
+        self.budget = budget
 
+    def build_messages(self, requirement) -> list:
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"Требование: {requirement.input_text}"}
+        ]
+
+    def parse_response(self, text: str, requirement) -> StructuredModel:
+        json_match = re.search(r"\{.*\}", text, re.DOTALL)
+        data = json.loads(json_match.group()) if json_match else {}
         return StructuredModel(
             functional_description=data.get("functional_description", requirement.input_text),
             target_language=data.get("target_language", "Python"),
             entities=data.get("entities", {})
         )
 
+    def parse_scanned(self, scanner: JsonObjectScanner, text: str, requirement) -> StructuredModel:
+        if scanner.result:
+            try:
+                data = json.loads(scanner.result)
+                return StructuredModel(
+                    functional_description=data.get("functional_description", requirement.input_text),
+                    target_language=data.get("target_language", "Python"),
+                    entities=data.get("entities", {})
+                )
+            except (ValueError, AttributeError):
+                pass
+        # модель вернула что-то странное, разбираем весь ответ как раньше
+        return self.parse_response(text, requirement)
+
+    def fallback(self, requirement) -> StructuredModel:
+        structured = StructuredModel(
+            functional_description=requirement.input_text,
+            target_language="Python",
+            entities={}
+        )
+        structured.failed = True
+        return structured
+
+    def analyze(self, requirement) -> StructuredModel:
+        try:
+            scanner = JsonObjectScanner()
+            parts = []
+            budget = self.budget.estimate_analysis(requirement)
+            usage = {"completion_tokens": 0, "finish_reason": None}
+            stream = self.router.chat(
+                messages=self.build_messages(requirement),
+                temperature=self.TEMPERATURE,
+                max_tokens=budget.max_tokens,
+                stream=True
+            )
+            try:
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    text = chunk.choices[0].delta.content or ""
+                    parts.append(text)
+                    track_usage(usage, chunk)
+                    # объект закрылся: дальше модель только болтает, обрываем поток
+                    if scanner.feed(text):
+                        usage["finish_reason"] = "json_closed"
+                        break
+            finally:
+                stream.close()
+
+            self.budget.record(budget, usage)
+            return self.parse_scanned(scanner, "".join(parts), requirement)
+        except Exception as e:
+            print(f"[RequirementAnalysisService] Ошибка: {e}")
+            return self.fallback(requirement)
+
+class CodeFenceStripper:
+    # Потоковый аналог re.sub(r"^```[a-zA-Z+]*\n|```$", ...): строки-ограждения
+    # выбрасываются, остальной текст отдается сразу, как только ясно, что это не ограждение.
+    # После закрывающего ограждения блок кода считается законченным (closed)
+    FENCE = "```"
+
+    def __init__(self):
+        self.pending = ""
+        self.inside_line = False
+        self.started = False
+        self.opened = False
+        self.closed = False
+        self.resuming = False
+        self.resume_text = ""
+
+    def resume(self):
+        # продолжение обрезанного ответа модель часто начинает заново с ```язык
+        self.resuming = True
+        self.resume_text = ""
+
+    def feed(self, chunk: str) -> str:
+        if self.closed:
+            return ""
+
+        if self.resuming:
+            self.resume_text += chunk
+            if "\n" not in self.resume_text and self._maybe_fence(self.resume_text):
+                return ""
+            chunk = self.resume_text
+            if chunk.startswith(self.FENCE):
+                chunk = chunk.split("\n", 1)[1]
+            self.resuming = False
+            self.resume_text = ""
+
+        self.pending += chunk
+        out = []
+
+        while "\n" in self.pending and not self.closed:
+            line, self.pending = self.pending.split("\n", 1)
+            if not self.inside_line and line.startswith(self.FENCE):
+                self._fence()
+            else:
+                if line.endswith(self.FENCE):
+                    line = line[:-len(self.FENCE)]
+                    self._fence()
+                out.append(line + "\n")
+            self.inside_line = False
+
+        if self.closed:
+            self.pending = ""
+        elif self.pending and (self.inside_line or not self._maybe_fence(self.pending)):
+            text = self.pending.rstrip("`")
+            if text:
+                out.append(text)
+                self.inside_line = True
+            self.pending = self.pending[len(text):]
+
+        return self._trim_leading("".join(out))
+
+    def flush(self) -> str:
+        if self.resuming and not self.resume_text.startswith(self.FENCE):
+            self.pending += self.resume_text
+        self.resuming = False
+        tail, self.pending = self.pending, ""
+        if self.closed or (not self.inside_line and tail.startswith(self.FENCE)):
+            return ""
+        if tail.endswith(self.FENCE):
+            tail = tail[:-len(self.FENCE)]
+        return self._trim_leading(tail)
+
+    def _fence(self):
+        if self.opened:
+            self.closed = True
+        else:
+            self.opened = True
+
+    def _maybe_fence(self, text: str) -> bool:
+        return text.startswith(self.FENCE) or self.FENCE.startswith(text)
+
+    def _trim_leading(self, text: str) -> str:
+        if not self.started:
+            text = text.lstrip()
+            self.started = bool(text)
+        return text
+
+
+CONTINUE_PROMPT = "Ответ оборвался. Продолжи код ровно с того места, где остановился, без повторов и пояснений."
+
+
+def continuation_messages(messages: list, raw_text: str) -> list:
+    return messages + [
+        {"role": "assistant", "content": raw_text},
+        {"role": "user", "content": CONTINUE_PROMPT}
+    ]
+
+
+def stream_code(router, messages: list, usage: dict = None,
+                max_continuations: int = Config.LLM_MAX_CONTINUATIONS, **kwargs):
+    # Отдает код по мере генерации и обрывает поток на закрывающем ```;
+    # если ответ обрезан по max_tokens, просит модель продолжить с того же места
+    usage = usage if usage is not None else {}
+    usage.update({"completion_tokens": 0, "finish_reason": None})
+    stripper = CodeFenceStripper()
+    raw = []
+    request_messages = messages
+
+    for attempt in range(max_continuations + 1):
+        finish_reason = None
+        stream = router.chat(messages=request_messages, stream=True, **kwargs)
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = choice.delta.content or ""
+                raw.append(delta)
+                track_usage(usage, chunk)
+                text = stripper.feed(delta)
+                if text:
+                    yield text
+                if stripper.closed:
+                    usage["finish_reason"] = "fence_closed"
+                    break
+                finish_reason = choice.finish_reason or finish_reason
+        finally:
+            stream.close()
+
+        if stripper.closed or finish_reason != "length":
+            break
+
+        print(f"[stream_code] Ответ обрезан по max_tokens, запрос продолжения {attempt + 1}/{max_continuations}")
+        stripper.resume()
+        request_messages = continuation_messages(messages, "".join(raw))
+
+    tail = stripper.flush()
+    if tail:
+        yield tail
+
+
 class ICodeGenerationService:
     def generateCode(self, structured, with_comments)->GeneratedCode:
         pass
 
+    def generateCodeStream(self, structured, with_comments):
+        pass
+
 class CodeGenerationService(ICodeGenerationService):
-    def generateCode(self, structured: StructuredModel, with_comments: bool = False) -> GeneratedCode:
+    TEMPERATURE = 0.1
+    ERROR_PREFIX = "// Ошибка генерации"
+
+    def __init__(self, router, budget):
+        self.router = router
+        self.budget = budget
+
+    def build_prompt(self, structured: StructuredModel, with_comments: bool) -> str:
         prompt = f"Напиши код на {structured.target_language}:\n{structured.functional_description}"
         if structured.entities:
             prompt += f"\nСущности: {structured.entities}"
         if with_comments:
             prompt += "\nДобавь подробные комментарии на русском языке."
+        return prompt
+
+    def build_messages(self, structured: StructuredModel, with_comments: bool) -> list:
+        return [{"role": "user", "content": self.build_prompt(structured, with_comments)}]
 
+    def generateCode(self, structured: StructuredModel, with_comments: bool = False) -> GeneratedCode:
         try:
-            response = client.chat.completions.create(
-                model=MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=4096
-            )
-            code = response.choices[0].message.content
-            code = re.sub(r"^```[a-zA-Z+]*\n|```$", "", code, flags=re.MULTILINE).strip()
+            budget = self.budget.estimate_generation(structured, with_comments)
+            usage = {}
+            code = "".join(stream_code(
+                self.router,
+                self.build_messages(structured, with_comments),
+                usage=usage,
+                temperature=self.TEMPERATURE,
+                max_tokens=budget.max_tokens
+            )).strip()
+            self.budget.record(budget, usage)
         except Exception as e:
             print(f"[CodeGenerationService] Ошибка: {e}")
-            code = f"// Ошибка генерации: {str(e)}"
+            code = f"{self.ERROR_PREFIX}: {str(e)}"
 
-        return GeneratedCode(
+        return self.build_result(structured, with_comments, code)
+
+    def build_result(self, structured: StructuredModel, with_comments: bool, code: str) -> GeneratedCode:
+        generated = GeneratedCode(
             name="Generated",
             language=structured.target_language,
             code_body=code,
             has_comments=with_comments
         )
+        generated.failed = code.startswith(self.ERROR_PREFIX)
+        return generated
+
+    def generateCodeStream(self, structured: StructuredModel, with_comments: bool = False):
+        try:
+            budget = self.budget.estimate_generation(structured, with_comments)
+            usage = {}
+            yield from stream_code(
+                self.router,
+                self.build_messages(structured, with_comments),
+                usage=usage,
+                temperature=self.TEMPERATURE,
+                max_tokens=budget.max_tokens
+            )
+            self.budget.record(budget, usage)
+        except Exception as e:
+            print(f"[CodeGenerationService] Ошибка потоковой генерации: {e}")
+            yield f"{self.ERROR_PREFIX}: {str(e)}"
 
 
 class IValidationService:
@@ -89,7 +362,13 @@ class IValidationService:
         pass
     
 
-class ValidationService:
+class ValidationService(IValidationService):
+    OPTIMIZE_TEMPERATURE = 0.2
+
+    def __init__(self, router, budget):
+        self.router = router
+        self.budget = budget
+
     def validate(self, generated_code: GeneratedCode) -> ValidationStatus:
         if generated_code.language == "Python":
             try:
@@ -101,18 +380,28 @@ class ValidationService:
             generated_code.validation_status = ValidationStatus.VALID
         return generated_code.validation_status
 
-    def optimize(self, generated_code: GeneratedCode) -> GeneratedCode:
+    def build_optimize_messages(self, generated_code: GeneratedCode) -> list:
         prompt = f"Оптимизируй этот код для производительности и читаемости:\n{generated_code.code_body}"
+        return [{"role": "user", "content": prompt}]
+
+    def apply_optimized(self, generated_code: GeneratedCode, code: str) -> GeneratedCode:
+        generated_code.code_body = code
+        generated_code.validation_status = ValidationStatus.OPTIMIZED
+        return generated_code
+
+    def optimize(self, generated_code: GeneratedCode) -> GeneratedCode:
         try:
-            response = client.chat.completions.create(
-                model=MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2
-            )
-            optimized = response.choices[0].message.content
-            optimized = re.sub(r"^```[a-zA-Z+]*\n|```$", "", optimized, flags=re.MULTILINE).strip()
-            generated_code.code_body = optimized
-            generated_code.validation_status = ValidationStatus.OPTIMIZED
+            budget = self.budget.estimate_optimize(generated_code)
+            usage = {}
+            optimized = "".join(stream_code(
+                self.router,
+                self.build_optimize_messages(generated_code),
+                usage=usage,
+                temperature=self.OPTIMIZE_TEMPERATURE,
+                max_tokens=budget.max_tokens
+            )).strip()
+            self.budget.record(budget, usage)
+            self.apply_optimized(generated_code, optimized)
         except Exception as e:
             print(f"[ValidationService] Оптимизация не удалась: {e}")
         return generated_code
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from config import Config
+
+
+class SessionCache:
+    def __init__(self, max_size: int = Config.SESSION_CACHE_SIZE,
+                 ttl_seconds: float = Config.SESSION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, session_id: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(session_id)
+            if entry and now < entry[1]:
+                self._memory.move_to_end(session_id)
+                self._stats["hits"] += 1
+                return dict(entry[0])
+            if entry:
+                del self._memory[session_id]
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, session_id: str, session_data: dict):
+        # запись не переживает саму сессию: срок хранения ограничен и TTL, и expire_time
+        expires_at = time.time() + self.ttl_seconds
+        try:
+            expire_time = datetime.strptime(session_data["expire_time"], "%Y-%m-%d %H:%M:%S")
+            expires_at = min(expires_at, expire_time.replace(tzinfo=timezone.utc).timestamp())
+        except (KeyError, TypeError, ValueError):
+            pass
+
+        with self._lock:
+            self._memory[session_id] = (dict(session_data), expires_at)
+            self._memory.move_to_end(session_id)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            if self._memory.pop(session_id, None):
+                self._stats["invalidations"] += 1
+
+    def invalidate_user(self, username: str):
+        with self._lock:
+            stale = [key for key, (data, _) in self._memory.items() if data.get("username") == username]
+            for key in stale:
+                del self._memory[key]
+            self._stats["invalidations"] += len(stale)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+
+class SessionSweeper:
+    def __init__(self, user_repository, interval: float = Config.SESSION_SWEEP_INTERVAL,
+                 batch_size: int = Config.SESSION_SWEEP_BATCH):
+        self.user_repository = user_repository
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "deleted_total": 0, "last_deleted": 0, "last_ms": 0.0,
+                       "last_run": None, "last_error": None}
+
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="session-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.sweep()
+            self._stop.wait(self.interval)
+
+    def sweep(self) -> int:
+        started = time.perf_counter()
+        try:
+            deleted = self.user_repository.purge_expired_sessions(batch_size=self.batch_size)
+            error = None
+        except Exception as e:
+            deleted, error = 0, str(e)
+            print(f"[SessionSweeper] Ошибка очистки сессий: {e}")
+
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["deleted_total"] += deleted
+            self._stats["last_deleted"] = deleted
+            self._stats["last_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self._stats["last_run"] = time.time()
+            self._stats["last_error"] = error
+        if deleted:
+            print(f"[SessionSweeper] Удалено истекших сессий: {deleted}")
+        return deleted
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["interval"] = self.interval
+        stats["batch_size"] = self.batch_size
+        stats["running"] = bool(self._thread and self._thread.is_alive())
+        return stats
@@ -0,0 +1,121 @@
+import copy
+import hashlib
+import json
+import threading
+
+from .models import StructuredModel, GeneratedCode
+from .services import IRequirementAnalysysService, ICodeGenerationService, IValidationService
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"executed": 0, "coalesced": 0, "max_waiters": 0}
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+                self._stats["max_waiters"] = max(self._stats["max_waiters"], call.waiters)
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["executed"] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            # результат общий, поэтому каждый ожидающий получает свою копию
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+            stats["waiting"] = sum(call.waiters for call in self._calls.values())
+        return stats
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        # только для текста требований: в коде отступы и регистр идентификаторов значимы
+        return " ".join(str(text).split())
+
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        raw = "\x1f".join(str(part) for part in parts)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class SingleFlightAnalysisService(IRequirementAnalysysService):
+    def __init__(self, service, flight: SingleFlight):
+        self.service = service
+        self.flight = flight
+
+    def analyze(self, requirement, use_cache: bool = True) -> StructuredModel:
+        if not use_cache:
+            return self.service.analyze(requirement, use_cache=False)
+
+        key = self.flight.fingerprint("analysis", self.flight.normalize_text(requirement.input_text))
+        return self.flight.do(key, lambda: self.service.analyze(requirement))
+
+
+class SingleFlightGenerationService(ICodeGenerationService):
+    def __init__(self, service, flight: SingleFlight):
+        self.service = service
+        self.flight = flight
+
+    def generateCode(self, structured: StructuredModel, with_comments: bool = False,
+                     use_cache: bool = True) -> GeneratedCode:
+        if not use_cache:
+            return self.service.generateCode(structured, with_comments, use_cache=False)
+
+        key = self.flight.fingerprint("generation", self.flight.normalize_text(structured.functional_description),
+                                      json.dumps(structured.entities, sort_keys=True, default=str, ensure_ascii=False),
+                                      structured.target_language, with_comments)
+        return self.flight.do(key, lambda: self.service.generateCode(structured, with_comments))
+
+    def generateCodeStream(self, structured: StructuredModel, with_comments: bool = False,
+                           use_cache: bool = True):
+        return self.service.generateCodeStream(structured, with_comments, use_cache=use_cache)
+
+
+class SingleFlightValidationService(IValidationService):
+    def __init__(self, service, flight: SingleFlight):
+        self.service = service
+        self.flight = flight
+
+    def validate(self, generated_code: GeneratedCode):
+        return self.service.validate(generated_code)
+
+    def optimize(self, generated_code: GeneratedCode) -> GeneratedCode:
+        key = self.flight.fingerprint("optimize", generated_code.language, generated_code.code_body)
+        optimized = self.flight.do(key, lambda: self.service.optimize(generated_code))
+        if optimized is not generated_code:
+            generated_code.code_body = optimized.code_body
+            generated_code.validation_status = optimized.validation_status
+        return generated_code
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import Config
+from .repo.database import SQLiteDatabase
+from .sessions import SessionCache
+
+
+class UserCache:
+    def __init__(self, max_size: int = Config.USER_CACHE_SIZE,
+                 ttl_seconds: float = Config.USER_CACHE_TTL,
+                 shared: bool = Config.USER_CACHE_SHARED,
+                 shared_db_path: str = Config.USER_CACHE_SHARED_DB,
+                 sync_interval: float = Config.USER_CACHE_SYNC_INTERVAL):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.sync_interval = sync_interval
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "remote_invalidations": 0}
+
+        # общий уровень - журнал инвалидаций в SQLite: каждый воркер раз в sync_interval
+        # дочитывает чужие записи, поэтому устаревание между процессами ограничено этим интервалом
+        self.shared = SQLiteDatabase.for_path(shared_db_path) if shared else None
+        self._last_seq = 0
+        self._last_sync = time.time()
+        if self.shared:
+            self.init_shared()
+
+    def init_shared(self):
+        with self.shared.transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_cache_invalidations (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._last_seq = cursor.execute(
+                'SELECT COALESCE(MAX(seq), 0) FROM user_cache_invalidations').fetchone()[0]
+
+    def get(self, username: str) -> Optional[dict]:
+        self._sync()
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(username)
+            if entry and now - entry[1] < self.ttl_seconds:
+                self._memory.move_to_end(username)
+                self._stats["hits"] += 1
+                return dict(entry[0])
+            if entry:
+                del self._memory[username]
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, username: str, user: dict):
+        with self._lock:
+            self._memory[username] = (dict(user), time.time())
+            self._memory.move_to_end(username)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._memory.pop(username, None)
+            self._stats["invalidations"] += 1
+
+        if not self.shared:
+            return
+        try:
+            now = time.time()
+            with self.shared.transaction() as cursor:
+                cursor.execute('INSERT INTO user_cache_invalidations (username, created_at) VALUES (?, ?)',
+                               (username, now))
+                cursor.execute('DELETE FROM user_cache_invalidations WHERE created_at < ?',
+                               (now - max(self.ttl_seconds, self.sync_interval) * 10,))
+        except Exception as e:
+            print(f"[UserCache] Ошибка записи инвалидации: {e}")
+
+    def _sync(self):
+        if not self.shared or time.time() - self._last_sync < self.sync_interval:
+            return
+
+        with self._lock:
+            if time.time() - self._last_sync < self.sync_interval:
+                return
+            self._last_sync = time.time()
+            last_seq = self._last_seq
+
+        try:
+            rows = self.shared.fetchall(
+                'SELECT seq, username FROM user_cache_invalidations WHERE seq > ? ORDER BY seq', (last_seq,))
+        except Exception as e:
+            print(f"[UserCache] Ошибка чтения инвалидаций: {e}")
+            return
+
+        if not rows:
+            return
+        with self._lock:
+            for seq, username in rows:
+                if self._memory.pop(username, None):
+                    self._stats["remote_invalidations"] += 1
+            self._last_seq = max(self._last_seq, rows[-1][0])
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["shared"] = bool(self.shared)
+        return stats
+
+
+class CachedUserRepository:
+    def __init__(self, repository, cache: UserCache, session_cache: SessionCache = None):
+        self.repository = repository
+        self.cache = cache
+        # сессии кэшируются коротко: выход в другом воркере виден не позже чем через SESSION_CACHE_TTL
+        self.session_cache = session_cache or SessionCache()
+
+    def __getattr__(self, name):
+        return getattr(self.repository, name)
+
+    def get_user_by_username(self, username: str) -> Optional[dict]:
+        user = self.cache.get(username)
+        if user:
+            return user
+
+        user = self.repository.get_user_by_username(username)
+        if user:
+            self.cache.set(username, user)
+        return user
+
+    def validate_session(self, session_id: str) -> Optional[dict]:
+        session_data = self.session_cache.get(session_id)
+        if session_data:
+            return session_data
+
+        session_data = self.repository.validate_session(session_id)
+        if session_data:
+            self.session_cache.set(session_id, session_data)
+        return session_data
+
+    def update_user(self, username: str, **kwargs) -> bool:
+        success = self.repository.update_user(username, **kwargs)
+        self.cache.invalidate(username)
+        self.session_cache.invalidate_user(username)
+        return success
+
+    def update_user_role(self, username: str, role: str) -> bool:
+        success = self.repository.update_user_role(username, role)
+        self.cache.invalidate(username)
+        self.session_cache.invalidate_user(username)
+        return success
+
+    def delete_session(self, session_id: str):
+        username = self.repository.get_session_username(session_id)
+        self.repository.delete_session(session_id)
+        self.session_cache.invalidate(session_id)
+        if username:
+            self.cache.invalidate(username)
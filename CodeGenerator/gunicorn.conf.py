@@ -0,0 +1,21 @@
+from config import Config
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+# потоки нужны для SSE: открытый поток событий не должен занимать весь процесс
+worker_class = "gthread"
+threads = Config.WEB_THREADS
+timeout = 120
+# приложение загружается один раз в мастере и делится с воркерами через copy-on-write,
+# а LLM-клиенты и фоновые потоки каждый воркер поднимает сам после fork
+preload_app = True
+
+
+def post_worker_init(worker):
+    from app import start_background
+    start_background(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    from app import stop_background
+    stop_background(worker.wsgi)
@@ -0,0 +1,70 @@
+import gzip
+import hashlib
+
+from flask import Response, request
+
+from config import Config
+
+GZIP_SUFFIX = "-gzip"
+
+
+def etag_for(*parts) -> str:
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+
+
+def etag_matches(etag: str) -> bool:
+    # сжатое представление получает свой сильный ETag с суффиксом, поэтому совпадением
+    # считается любой из двух вариантов
+    if_none_match = request.if_none_match
+    return (if_none_match.star_tag or
+            if_none_match.contains(etag) or
+            if_none_match.contains(etag + GZIP_SUFFIX))
+
+
+def mark_revalidate(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    # ответы персональные: браузер хранит копию, но каждый раз сверяет ее с сервером
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
+
+
+def not_modified(etag: str):
+    if request.method in ("GET", "HEAD") and etag_matches(etag):
+        return mark_revalidate(Response(status=304), etag)
+    return None
+
+
+def conditional(response: Response, etag: str = None) -> Response:
+    # без готового ключа ETag считается по телу ответа
+    if etag is None:
+        etag = etag_for(response.get_data())
+    if request.method in ("GET", "HEAD") and response.status_code == 200 and etag_matches(etag):
+        return mark_revalidate(Response(status=304), etag)
+    return mark_revalidate(response, etag)
+
+
+def accepts_gzip() -> bool:
+    return request.accept_encodings["gzip"] > 0
+
+
+def compress_response(response: Response) -> Response:
+    response.vary.add("Accept-Encoding")
+    if (response.status_code < 200 or response.status_code in (204, 206, 304) or
+            response.direct_passthrough or response.is_streamed or
+            "Content-Encoding" in response.headers or
+            response.mimetype not in Config.GZIP_MIMETYPES or
+            not accepts_gzip()):
+        return response
+
+    data = response.get_data()
+    if len(data) < Config.GZIP_MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=Config.GZIP_LEVEL))
+    response.headers["Content-Encoding"] = "gzip"
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag + GZIP_SUFFIX)
+    return response
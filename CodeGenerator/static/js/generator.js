@@ -1,5 +1,8 @@
 const HISTORY_STORAGE_KEY = 'codegen_history';
 const MAX_HISTORY_ITEMS = 10;
+const OPTIMIZATION_POLL_INTERVAL = 2000;
+// около 5 минут, как JOB_WATCH_TIMEOUT на сервере
+const OPTIMIZATION_POLL_MAX_ATTEMPTS = 150;
 
 function loadHistoryFromStorage() {
     try {
@@ -87,7 +90,9 @@ document.addEventListener('DOMContentLoaded', function() {
             framework: document.getElementById('framework').value,
             role: document.getElementById('role').value,
             addComments: document.getElementById('addComments').checked,
-            optimizeCode: document.getElementById('optimizeCode').checked
+            optimizeCode: document.getElementById('optimizeCode').checked,
+            freshSample: document.getElementById('freshSample').checked,
+            hedged: document.getElementById('hedgedMode').checked
         };
         
         if (!formData.requirement.trim()) {
@@ -99,46 +104,67 @@ document.addEventListener('DOMContentLoaded', function() {
         generateBtn.disabled = true;
         showStatus('processing', 'Генерация кода...');
         
+        function onGenerationDone(data) {
+            displayGeneratedCode(data.code, data.language);
+
+            const role = formData.role || 'Разработчик';
+            const generatedBy = data.generated_by || 'неизвестно';
+
+            showStatus('success', `Код успешно сгенерирован для роли "${role}" пользователем ${generatedBy}, статус проверки: ${data.status} (сохранено в историю)`);
+            const historyInfo = {};
+            if (templateData) {
+                historyInfo.template = templateData.name;
+                historyInfo.category = templateData.category;
+            }
+            addToHistory(formData.requirement, data.code, data.language, historyInfo);
+
+            if (data.optimization_job_id) {
+                waitForOptimization(data.optimization_job_id);
+            }
+        }
+
         try {
-            const response = await fetch('/generate', {
+            // генерацию выполняет очередь задач, поток только пересказывает ее события
+            const response = await fetch('/generate/stream', {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json'
+                    'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream'
                 },
                 body: JSON.stringify(formData)
             });
-            
-            const result = await response.json();
 
-            if (response.ok) {
-                let generatedCode = '';
-                let language = '';
-                let generatedBy = '';
-                
-                if (result.code && typeof result.code === 'object') {
-                    generatedCode = result.code.code || '';
-                    language = result.code.language || '';
-                    generatedBy = result.generated_by || result.code.generated_by || 'неизвестно';
-                } else {
-                    generatedCode = result.code || '';
-                    language = result.language || '';
-                    generatedBy = result.generated_by || 'неизвестно';
-                }
-                
-                displayGeneratedCode(generatedCode, language);
+            if (!response.ok) {
+                const result = await response.json();
+                showStatus('error', result.error || 'Ошибка генерации кода');
+                return;
+            }
 
-                const role = result.role || formData.role || 'Разработчик';
+            let codeElement = null;
+            let streamedCode = '';
 
-                showStatus('success', `Код успешно сгенерирован для роли "${role}" пользователем ${generatedBy} (сохранено в историю)`);
-                const historyInfo = {};
-                if (templateData) {
-                    historyInfo.template = templateData.name;
-                    historyInfo.category = templateData.category;
+            await readEventStream(response, function(event, data) {
+                if (event === 'status' && data.status === 'queued') {
+                    showStatus('processing', 'Задача в очереди, ожидание свободного обработчика...');
+                } else if (event === 'status' && data.status === 'running') {
+                    showStatus('processing', formData.hedged ? 'Параллельная генерация вариантов...' : 'Генерация кода...');
+                } else if (event === 'analysis') {
+                    // при повторном запуске задачи поток начинается заново
+                    codeElement = startCodeStream();
+                    streamedCode = '';
+                    showStatus('processing', 'Требование разобрано, генерация кода...');
+                } else if (event === 'token') {
+                    codeElement = codeElement || startCodeStream();
+                    streamedCode += data.text;
+                    codeElement.textContent = streamedCode;
+                } else if (event === 'done') {
+                    onGenerationDone(data);
+                } else if (event === 'error') {
+                    showStatus('error', data.error || 'Ошибка генерации кода');
+                } else if (event === 'timeout') {
+                    showStatus('error', 'Генерация не завершилась вовремя, попробуйте позже');
                 }
-                addToHistory(formData.requirement, generatedCode, language, historyInfo);
-            } else {
-                showStatus('error', result.error || 'Ошибка генерации кода');
-            }
+            });
         } catch (error) {
             console.error('Generation error:', error);
             showStatus('error', 'Ошибка соединения с сервером');
@@ -459,6 +485,83 @@ document.addEventListener('DOMContentLoaded', function() {
         updateCodePreviewInfo();
     }
     
+    async function waitForOptimization(jobId) {
+        for (let attempt = 0; attempt < OPTIMIZATION_POLL_MAX_ATTEMPTS; attempt++) {
+            await new Promise(resolve => setTimeout(resolve, OPTIMIZATION_POLL_INTERVAL));
+
+            try {
+                const response = await fetch(`/api/jobs/${jobId}`);
+                if (!response.ok) {
+                    return;
+                }
+
+                const result = await response.json();
+                const job = result.job;
+                if (!result.success || !job) {
+                    return;
+                }
+
+                if (job.status === 'done') {
+                    displayGeneratedCode(job.result.code, job.result.language);
+                    showStatus('success', 'Оптимизированная версия кода готова');
+                    return;
+                }
+                if (job.status === 'failed') {
+                    showStatus('info', 'Оптимизация не удалась, показан исходный код');
+                    return;
+                }
+            } catch (error) {
+                console.error('Optimization polling error:', error);
+                return;
+            }
+        }
+
+        showStatus('info', 'Оптимизация не завершилась вовремя, показан исходный код');
+    }
+
+    function startCodeStream() {
+        const codeOutput = document.getElementById('codeOutput');
+        codeOutput.innerHTML = '';
+        const codeElement = document.createElement('code');
+        codeOutput.appendChild(codeElement);
+        updateCodePreviewInfo();
+        return codeElement;
+    }
+
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) {
+                break;
+            }
+
+            buffer += decoder.decode(value, { stream: true });
+            let boundary = buffer.indexOf('\n\n');
+
+            while (boundary !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                boundary = buffer.indexOf('\n\n');
+
+                let event = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        event = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                });
+
+                onEvent(event, data ? JSON.parse(data) : {});
+            }
+        }
+    }
+
     function showStatus(type, message) {
         const statusContainer = document.getElementById('statusContainer');
         const statusIndicator = document.getElementById('statusIndicator');
@@ -326,7 +326,8 @@ function getRoleName(roleCode) {
     const roleNames = {
         'DEVELOPER': 'Разработчик',
         'SYSTEM_ANALYST': 'Системный аналитик', 
-        'STUDENT': 'Студент'
+        'STUDENT': 'Студент',
+        'ADMIN': 'Администратор'
     };
     return roleNames[roleCode] || roleCode;
 }
@@ -56,7 +56,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         imageModalTitle.textContent = projectName;
         
-        projectImage.src = window.location.origin + "/static/picture.jpeg";
+        projectImage.src = projectImage.dataset.imageUrl;
         projectImage.alt = `Изображение проекта: ${projectName}`;
         
         imageInfo.innerHTML = `
@@ -244,4 +244,136 @@ document.addEventListener('DOMContentLoaded', function() {
             completedProjects.textContent = parseInt(completedProjects.textContent) - 1;
         }
     }
+    
+    const projectsGrid = document.getElementById('projectsGrid');
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    const filterStatus = document.getElementById('filterStatus');
+    const filterLanguage = document.getElementById('filterLanguage');
+    const filterFramework = document.getElementById('filterFramework');
+    const projectSearch = document.getElementById('projectSearch');
+    let nextCursor = projectsGrid.getAttribute('data-next-cursor') || null;
+    let nextOffset = null;
+    let searchTimer = null;
+    
+    function escapeHtml(value) {
+        const div = document.createElement('div');
+        div.textContent = value == null ? '' : String(value);
+        return div.innerHTML;
+    }
+    
+    function renderProjectCard(project) {
+        const completed = project.status === 'completed';
+        const card = document.createElement('div');
+        card.className = 'project-card';
+        card.setAttribute('data-id', project.id);
+        card.setAttribute('data-status', project.status);
+        card.innerHTML = `
+            <div class="project-header">
+                <h3 class="project-title">${escapeHtml(project.name)}</h3>
+                <p class="project-description">${escapeHtml(project.description)}</p>
+            </div>
+            <div class="project-tags">
+                <span class="project-tag language">${escapeHtml(project.language)}</span>
+                <span class="project-tag framework">${escapeHtml(project.framework)}</span>
+                <span class="project-tag ${completed ? 'status' : 'status-draft'}">${completed ? 'Завершен' : 'Черновик'}</span>
+            </div>
+            <div class="project-stats">
+                <div class="stat-item">
+                    <span class="stat-item-label">Строк кода:</span>
+                    <span class="stat-item-value">${escapeHtml(project.lines_of_code)}</span>
+                </div>
+                <div class="stat-item">
+                    <span class="stat-item-label">Файлов:</span>
+                    <span class="stat-item-value">${escapeHtml(project.files_count)}</span>
+                </div>
+            </div>
+            <div class="project-meta">
+                <i class="far fa-clock"></i>
+                <span>Изменен: ${escapeHtml((project.updated_at || '').slice(0, 10))}</span>
+            </div>
+            <div class="project-footer">
+                <div class="project-actions">
+                    <button class="action-btn primary open-project" data-id="${project.id}">
+                        <i class="fas fa-folder-open"></i>
+                        Открыть
+                    </button>
+                    ${completed ? `
+                    <button class="action-btn download-project" data-id="${project.id}">
+                        <i class="fas fa-download"></i>
+                        Скачать
+                    </button>` : `
+                    <button class="action-btn edit-project" data-id="${project.id}">
+                        <i class="fas fa-edit"></i>
+                        Редактировать
+                    </button>`}
+                </div>
+                <button class="action-btn danger delete-project" data-id="${project.id}">
+                    <i class="fas fa-trash"></i>
+                </button>
+            </div>
+        `;
+        return card;
+    }
+    
+    async function loadProjects(reset) {
+        const query = projectSearch.value.trim();
+        const params = new URLSearchParams();
+        let url;
+        
+        // при поиске результаты упорядочены по релевантности, фильтры списка не применяются
+        if (query) {
+            params.set('q', query);
+            if (!reset && nextOffset) params.set('offset', nextOffset);
+            url = `/api/projects/search?${params.toString()}`;
+        } else {
+            if (filterStatus.value) params.set('status', filterStatus.value);
+            if (filterLanguage.value) params.set('language', filterLanguage.value);
+            if (filterFramework.value) params.set('framework', filterFramework.value);
+            if (!reset && nextCursor) params.set('cursor', nextCursor);
+            url = `/api/projects?${params.toString()}`;
+        }
+        
+        loadMoreBtn.disabled = true;
+        try {
+            const response = await fetch(url);
+            const result = await response.json();
+            
+            if (!result.success) {
+                alert('Ошибка: ' + result.message);
+                return;
+            }
+            
+            if (reset) {
+                projectsGrid.innerHTML = '';
+                if (result.projects.length === 0) {
+                    projectsGrid.innerHTML = `
+                        <div class="empty-state" style="display: block;">
+                            <i class="fas fa-folder-open"></i>
+                            <h3>Нет проектов</h3>
+                            <p>Проектов с выбранными параметрами не найдено.</p>
+                        </div>
+                    `;
+                }
+            }
+            
+            result.projects.forEach(project => projectsGrid.appendChild(renderProjectCard(project)));
+            nextCursor = result.next_cursor || null;
+            nextOffset = result.next_offset || null;
+            loadMoreBtn.style.display = (nextCursor || nextOffset) ? 'flex' : 'none';
+        } catch (error) {
+            console.error('Ошибка:', error);
+            alert('Произошла ошибка при загрузке проектов');
+        } finally {
+            loadMoreBtn.disabled = false;
+        }
+    }
+    
+    loadMoreBtn.addEventListener('click', () => loadProjects(false));
+    [filterStatus, filterLanguage, filterFramework].forEach(select => {
+        select.addEventListener('change', () => loadProjects(true));
+    });
+    projectSearch.addEventListener('input', function() {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => loadProjects(true), 300);
+    });
 });
\ No newline at end of file
@@ -0,0 +1,207 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+
+from config import Config
+
+COMPRESSIBLE = (".js", ".css", ".svg", ".json", ".txt")
+# после этих символов "/" начинает регулярное выражение, а не деление
+REGEX_PREFIX = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORDS = ("return", "typeof", "case", "do", "else", "in", "of", "void", "yield", "await")
+
+
+def minify_js(source: str) -> str:
+    # консервативная минификация: убираются комментарии и отступы, переводы строк
+    # сохраняются, поэтому автоматическая расстановка точек с запятой не меняется
+    out = []
+    i, n = 0, len(source)
+    pending_space = None
+    last = ""
+    braces = []
+
+    def emit(text):
+        nonlocal pending_space, last
+        if pending_space and out:
+            out.append(pending_space)
+        pending_space = None
+        out.append(text)
+        last = text[-1]
+
+    while i < n:
+        ch = source[i]
+        nxt = source[i + 1] if i + 1 < n else ""
+
+        if ch in " \t\r\n":
+            j = i
+            while j < n and source[j] in " \t\r\n":
+                j += 1
+            chunk = source[i:j]
+            if "\n" in chunk or pending_space == "\n":
+                pending_space = "\n"
+            else:
+                pending_space = pending_space or " "
+            i = j
+            continue
+
+        if ch == "/" and nxt == "/":
+            j = source.find("\n", i)
+            i = n if j == -1 else j
+            continue
+
+        if ch == "/" and nxt == "*":
+            j = source.find("*/", i + 2)
+            comment = source[i:n if j == -1 else j + 2]
+            pending_space = "\n" if "\n" in comment or pending_space == "\n" else (pending_space or " ")
+            i = n if j == -1 else j + 2
+            continue
+
+        if ch in "'\"":
+            j = i + 1
+            while j < n and source[j] != ch:
+                j += 2 if source[j] == "\\" else 1
+            emit(source[i:j + 1])
+            i = j + 1
+            continue
+
+        if ch == "`" or (ch == "}" and braces and braces[-1] == "`"):
+            # шаблонная строка копируется как есть до конца или до подстановки ${...}
+            if ch == "}":
+                braces.pop()
+            j = i + 1
+            while j < n and source[j] != "`":
+                if source[j] == "\\":
+                    j += 2
+                    continue
+                if source[j] == "$" and j + 1 < n and source[j + 1] == "{":
+                    break
+                j += 1
+            if j < n and source[j] == "$":
+                emit(source[i:j + 2])
+                braces.append("`")
+                i = j + 2
+            else:
+                emit(source[i:j + 1])
+                i = j + 1
+            continue
+
+        if ch == "/":
+            word = re.search(r"([A-Za-z_$]+)\s*$", "".join(out[-3:]))
+            if not out or last in REGEX_PREFIX or (word and word.group(1) in REGEX_KEYWORDS):
+                j, in_class = i + 1, False
+                while j < n and (source[j] != "/" or in_class) and source[j] != "\n":
+                    if source[j] == "\\":
+                        j += 2
+                        continue
+                    if source[j] == "[":
+                        in_class = True
+                    elif source[j] == "]":
+                        in_class = False
+                    j += 1
+                j += 1
+                while j < n and source[j].isalpha():
+                    j += 1
+                emit(source[i:j])
+                i = j
+                continue
+
+        if ch == "{":
+            braces.append("{")
+        elif ch == "}" and braces:
+            braces.pop()
+
+        j = i + 1
+        if ch.isalnum() or ch in "_$":
+            while j < n and (source[j].isalnum() or source[j] in "_$"):
+                j += 1
+        emit(source[i:j])
+        i = j
+
+    return "".join(out).strip() + "\n"
+
+
+def minify_css(source: str) -> str:
+    parts = re.split(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""", source)
+    for index in range(0, len(parts), 2):
+        text = re.sub(r"/\*.*?\*/", "", parts[index], flags=re.S)
+        text = re.sub(r"\s+", " ", text)
+        # пробел перед ":" значим в селекторах (a :hover), поэтому он не трогается
+        text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+        text = re.sub(r":\s+", ":", text)
+        text = text.replace(";}", "}")
+        parts[index] = text
+    return "".join(parts).strip() + "\n"
+
+
+class AssetManifest:
+    MINIFIERS = {".js": minify_js, ".css": minify_css}
+
+    def __init__(self, static_folder: str, output_dir: str = Config.ASSETS_DIR):
+        self.static_folder = static_folder
+        self.output_dir = output_dir
+        self.output_path = os.path.join(static_folder, output_dir)
+        self.manifest_path = os.path.join(self.output_path, "manifest.json")
+        self.entries = {}
+
+    def load(self) -> bool:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+            return True
+        except (OSError, ValueError):
+            self.entries = {}
+            return False
+
+    def sources(self):
+        for root, dirs, files in os.walk(self.static_folder):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != self.output_path]
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, self.static_folder).replace(os.sep, "/"), path
+
+    def build(self) -> dict:
+        started = time.perf_counter()
+        entries = {}
+        stats = {"files": 0, "source_bytes": 0, "minified_bytes": 0, "gzip_bytes": 0}
+
+        for logical, path in self.sources():
+            with open(path, "rb") as f:
+                data = f.read()
+            stem, ext = os.path.splitext(logical)
+
+            minify = self.MINIFIERS.get(ext)
+            built = minify(data.decode("utf-8")).encode("utf-8") if minify else data
+            # имя файла зависит от содержимого, поэтому его можно кэшировать навсегда
+            digest = hashlib.sha256(built).hexdigest()[:12]
+            target = f"{stem}.{digest}{ext}"
+            self._write(target, built)
+
+            stats["files"] += 1
+            stats["source_bytes"] += len(data)
+            stats["minified_bytes"] += len(built)
+            if ext in COMPRESSIBLE:
+                compressed = gzip.compress(built, compresslevel=9, mtime=0)
+                self._write(target + ".gz", compressed)
+                stats["gzip_bytes"] += len(compressed)
+            entries[logical] = target
+
+        self._write("manifest.json", json.dumps(entries, indent=2, sort_keys=True).encode("utf-8"), replace=True)
+        self.entries = entries
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        return stats
+
+    def _write(self, relative: str, data: bytes, replace: bool = False):
+        path = os.path.join(self.output_path, relative)
+        if not replace and os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # запись через временный файл: соседний процесс не увидит недописанный ресурс
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def resolve(self, filename: str):
+        return self.entries.get(filename)